@@ -0,0 +1,35 @@
+# Numba-compiled kernels for the simulation's numeric hot loops.
+# cache=True stores the compiled machine code in __pycache__, so only the very
+# first run on a machine pays the JIT compilation cost. The kernels are serial:
+# a round decides a few dozen agents, too few to pay for starting worker threads.
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def decide_rule_based(funds, inventory, valuation, is_buyer, rand_u,
+                      buyer_factor_lo, buyer_factor_hi, seller_factor_lo, seller_factor_hi,
+                      out_price, out_valid):
+    """
+    Computes one round of rule-based decisions for a whole agent population.
+
+    Buyers price at a random factor of their valuation in [buyer_factor_lo, buyer_factor_hi)
+    and may bid if they have funds for it; sellers price at a random factor of their cost in
+    [seller_factor_lo, seller_factor_hi) and may ask if they have inventory.
+
+    Args:
+        funds, inventory, valuation, is_buyer: Per-agent state arrays of equal length.
+        rand_u: Uniform [0, 1) draws, one per agent.
+        out_price: Output array receiving each agent's price (rounded to 2 decimals).
+        out_valid: Output bool array, True where the agent places a bid/ask.
+    """
+    for i in range(funds.shape[0]):
+        if is_buyer[i]:
+            factor = buyer_factor_lo + (buyer_factor_hi - buyer_factor_lo) * rand_u[i]
+            price = np.round(factor * valuation[i], 2)
+            out_valid[i] = price > 0 and funds[i] > 0 and funds[i] >= price
+        else:
+            factor = seller_factor_lo + (seller_factor_hi - seller_factor_lo) * rand_u[i]
+            price = np.round(factor * valuation[i], 2)
+            out_valid[i] = price > 0 and inventory[i] > 0
+        out_price[i] = price
@@ -2,6 +2,7 @@ import streamlit as st
 import google.generativeai as genai
 from google.api_core import exceptions as google_exceptions # For specific error handling
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Regarding SDK usage:
 # The provided research report emphasizes using `google-genai` SDK and a `client = genai.Client()` pattern.
@@ -20,6 +21,9 @@ import os
 # For local development, we'll use session state.
 # GOOGLE_API_KEY_ENV_VAR = "GOOGLE_API_KEY"
 
+# Upper bound on concurrent requests issued by generate_text_batch.
+MAX_BATCH_CONCURRENCY = 8
+
 def get_api_key():
     """
     Prompts the user for their Google AI Studio API key and stores it in session_state.
@@ -104,31 +108,111 @@ def generate_text(prompt: str, model_name: str = "models/gemini-2.0-flash-latest
             generation_config=gen_config
         )
         return response.text
-    except google_exceptions.ResourceExhausted as e:
+    except Exception as e:
+        _report_generation_error(e, model_name)
+    return None
+
+def generate_text_batch(prompts: list[str], model_name: str = "models/gemini-2.0-flash-latest", temperature: float = 0.7) -> list[str | None]:
+    """
+    Generates text for several prompts in one call.
+
+    The client is configured once and the requests are issued concurrently, so the
+    wall-clock cost is roughly one round trip instead of one per prompt.
+
+    Args:
+        prompts (list[str]): The prompts to send to the LLM.
+        model_name (str): The name of the model to use (e.g., "gemini-pro").
+        temperature (float): The temperature for generation.
+
+    Returns:
+        list[str | None]: One generated text per prompt, in order. Entries are None
+                          for prompts that failed.
+    """
+    if not prompts:
+        return []
+
+    if not configure_llm_client():
+        st.error("LLM client not configured. Please enter your API key.")
+        return [None] * len(prompts)
+
+    try:
+        model = genai.GenerativeModel(model_name)
+        gen_config = genai.types.GenerationConfig(temperature=temperature)
+    except Exception as e:
+        _report_generation_error(e, model_name)
+        return [None] * len(prompts)
+
+    def _generate(prompt: str) -> str:
+        return model.generate_content(prompt, generation_config=gen_config).text
+
+    results: list[str | None] = []
+    max_workers = min(MAX_BATCH_CONCURRENCY, len(prompts))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_generate, prompt) for prompt in prompts]
+        # Errors are reported from this (the Streamlit script) thread, not the workers.
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                _report_generation_error(e, model_name)
+                results.append(None)
+    return results
+
+async def generate_text_async(prompt: str, model_name: str = "models/gemini-2.0-flash-latest", temperature: float = 0.7) -> str | None:
+    """
+    Async counterpart of generate_text, so several prompts can be awaited concurrently
+    (e.g. with asyncio.gather) instead of one after another.
+
+    Args:
+        prompt (str): The prompt to send to the LLM.
+        model_name (str): The name of the model to use (e.g., "gemini-pro").
+        temperature (float): The temperature for generation.
+
+    Returns:
+        str | None: The generated text, or None if an error occurs.
+    """
+    if not configure_llm_client():
+        st.error("LLM client not configured. Please enter your API key.")
+        return None
+
+    try:
+        model = genai.GenerativeModel(model_name)
+        gen_config = genai.types.GenerationConfig(temperature=temperature)
+        response = await model.generate_content_async(
+            prompt,
+            generation_config=gen_config
+        )
+        return response.text
+    except Exception as e:
+        _report_generation_error(e, model_name)
+    return None
+
+def _report_generation_error(e: Exception, model_name: str) -> None:
+    """Shows a user-facing Streamlit error for an exception raised while generating text."""
+    if isinstance(e, google_exceptions.ResourceExhausted):
         st.error(f"API Error: Rate limit exceeded or quota exhausted. Please try again later. Details: {e}")
-    except google_exceptions.InvalidArgument as e:
+    elif isinstance(e, google_exceptions.InvalidArgument):
         st.error(f"API Error: Invalid argument in the request. Check prompt or model. Details: {e}")
-    except google_exceptions.PermissionDenied as e:
+    elif isinstance(e, google_exceptions.PermissionDenied):
         st.error(f"API Error: Permission denied. Check your API key. Details: {e}")
-    except google_exceptions.FailedPrecondition as e:
+    elif isinstance(e, google_exceptions.FailedPrecondition):
         # This can happen if, for example, billing is not enabled for a project using Vertex AI models,
         # or other preconditions are not met.
         st.error(f"API Error: Failed precondition. Details: {e}")
-    except google_exceptions.NotFound as e:
+    elif isinstance(e, google_exceptions.NotFound):
         st.error(f"API Error: Resource not found (e.g., model name '{model_name}' is incorrect). Details: {e}")
-    except google_exceptions.InternalServerError as e:
+    elif isinstance(e, google_exceptions.InternalServerError):
         st.error(f"API Error: Internal server error on Google's side. Please try again later. Details: {e}")
-    except google_exceptions.ServiceUnavailable as e:
+    elif isinstance(e, google_exceptions.ServiceUnavailable):
         st.error(f"API Error: Service unavailable. Please try again later. Details: {e}")
-    except AttributeError as e:
+    elif isinstance(e, AttributeError):
         # Handles cases where response might not have .text (e.g. blocked content)
         # More specific check for response.prompt_feedback might be needed if safety settings are active
         st.error(f"Error processing LLM response: {e}. The response might have been blocked or is empty.")
         # Example: if response.candidates and response.candidates[0].finish_reason == genai.types.FinishReason.SAFETY:
         #    st.error("Response blocked due to safety settings.")
-    except Exception as e: # Catch any other unexpected errors
+    else: # Any other unexpected errors
         st.error(f"An unexpected error occurred while generating text: {type(e).__name__} - {e}")
-    return None
 
 if __name__ == "__main__":
     # Example usage within Streamlit app context (for testing this file directly)
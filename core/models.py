@@ -1,9 +1,14 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Literal, Optional
+from dataclasses import dataclass, fields
+from typing import List, Dict, Any, Literal, Optional, Tuple, Callable
+from functools import lru_cache
 import random # For RuleBasedAgent decisions
+import numpy as np # For AgentPool's vectorized rule-based decisions
 import logging
-import json
-from jinja2 import Template
+import asyncio
+import orjson
+from collections import ChainMap
+from string import Formatter
 
 # Placeholder imports - these modules will be created/fleshed out later
 # from .llm_client import generate_text # Assuming direct import for now
@@ -11,23 +16,31 @@ from jinja2 import Template
 # For now, to avoid import errors, we'll define dummy functions if needed by LLMAgent
 # or structure LLMAgent to accept client/prompt_manager as arguments.
 
-class AgentConfig(BaseModel):
+@dataclass(frozen=True, slots=True)
+class AgentConfig:
     """Configuration for an agent in the simulation."""
-    agent_id: str = Field(..., description="Unique identifier for the agent")
-    agent_type: Literal["buyer", "seller"] = Field(..., description="Type of agent")
-    initial_funds: Optional[float] = Field(
-        None, description="Initial funds for a buyer agent", ge=0
-    )
-    initial_inventory: Optional[int] = Field(
-        None, description="Initial inventory for a seller agent", ge=0
-    )
-    llm_persona_prompt_key: Optional[str] = Field(
-        None, description="Key to retrieve LLM persona/prompt for this agent"
-    )
+    agent_id: str # Unique identifier for the agent
+    agent_type: Literal["buyer", "seller"] # Type of agent
+    initial_funds: Optional[float] = None # Initial funds for a buyer agent
+    initial_inventory: Optional[int] = None # Initial inventory for a seller agent
+    llm_persona_prompt_key: Optional[str] = None # Key to retrieve LLM persona/prompt for this agent
     # For rule-based agents, we might have other parameters, e.g., valuation/cost
-    valuation_or_cost: Optional[float] = Field(
-        None, description="Valuation for buyer or cost for seller (for rule-based agents)"
-    )
+    valuation_or_cost: Optional[float] = None # Valuation for buyer or cost for seller (for rule-based agents)
+
+    def __post_init__(self):
+        if self.agent_type not in ("buyer", "seller"):
+            raise ValueError(f"agent_type must be 'buyer' or 'seller', got {self.agent_type!r}")
+        if self.initial_funds is not None and self.initial_funds < 0:
+            raise ValueError("initial_funds must be >= 0")
+        if self.initial_inventory is not None and self.initial_inventory < 0:
+            raise ValueError("initial_inventory must be >= 0")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentConfig":
+        """Builds an AgentConfig from a dict, ignoring keys that are not config fields."""
+        return cls(**{name: value for name, value in data.items() if name in _AGENT_CONFIG_FIELDS})
+
+_AGENT_CONFIG_FIELDS = frozenset(field.name for field in fields(AgentConfig))
 
 class BidAsk(BaseModel):
     """Represents a bid or an ask in the market."""
@@ -45,41 +58,40 @@ class Transaction(BaseModel):
     quantity: int
     round: int # The round in which this transaction occurred
 
-class MarketState(BaseModel):
-    """Represents the state of the market at a given point in time."""
-    current_round: int = Field(0, description="The current simulation round")
-    bids: List[BidAsk] = Field(default_factory=list, description="List of active bids in the current round")
-    asks: List[BidAsk] = Field(default_factory=list, description="List of active asks in the current round")
+@dataclass(frozen=True, slots=True)
+class MarketState:
+    """
+    Represents the state of the market at a given point in time.
+    States are immutable; the simulation derives each round's state with dataclasses.replace,
+    so a state can be handed to agents or kept in the history without copying it.
+    """
+    current_round: int = 0 # The current simulation round
+    bids: Tuple[BidAsk, ...] = () # Active bids in the current round
+    asks: Tuple[BidAsk, ...] = () # Active asks in the current round
     # For MVP, price_history could be simple list of average prices or all transaction prices
-    price_history: List[Dict[str, Any]] = Field(default_factory=list, description="History of prices, e.g., average transaction price per round")
-    transaction_log: List[Transaction] = Field(default_factory=list, description="Log of all transactions that have occurred")
+    price_history: Tuple[Dict[str, Any], ...] = () # History of prices, e.g., average transaction price per round
+    transaction_log: Tuple[Transaction, ...] = () # Log of all transactions that have occurred
     # Potentially add agent states here or keep them separate
-    # agent_states: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Current states of all agents")
-
-# Forward reference resolution for Pydantic models if they are defined later or in circular dependencies
-# (Not strictly necessary here as they are in order, but good practice)
-MarketState.update_forward_refs()
+    # agent_states: Dict[str, Dict[str, Any]] = field(default_factory=dict) # Current states of all agents
 
 
 # --- Agent Base Classes (as per section 4.1 of DETAILED_IMPLEMENTATION_PLAN.MD) ---
-# These are more than just "initial Pydantic models" for Phase 0,
+# These are more than just the initial data models for Phase 0,
 # but good to stub out as they are part of core/models.py.
 # Full implementation will be in Phase 1.
 
-class Agent(BaseModel):
+class Agent:
     """Base class for all agents in the simulation."""
-    agent_id: str
-    agent_type: Literal["buyer", "seller"]
-    
-    # Attributes that will be updated during simulation
-    funds: Optional[float] = None
-    inventory: Optional[int] = None
-
-    class Config:
-        arbitrary_types_allowed = True # To allow methods if we add them later
-
-    def __init__(self, config: AgentConfig, **data: Any):
-        super().__init__(agent_id=config.agent_id, agent_type=config.agent_type, **data)
+    # Agents are plain slotted classes rather than Pydantic models: a simulation holds
+    # many of them, and slots drop the per-instance __dict__ and speed up attribute access.
+    __slots__ = ("agent_id", "agent_type", "funds", "inventory", "_config")
+
+    def __init__(self, config: AgentConfig):
+        self.agent_id: str = config.agent_id
+        self.agent_type: Literal["buyer", "seller"] = config.agent_type
+        # Attributes that will be updated during simulation
+        self.funds: Optional[float] = None
+        self.inventory: Optional[int] = None
         if self.agent_type == "buyer":
             self.funds = config.initial_funds
             self.inventory = 0 # Buyers start with 0 inventory of the good
@@ -89,6 +101,14 @@ class Agent(BaseModel):
         # Store config for reference if needed
         self._config = config
 
+    @property
+    def config(self) -> AgentConfig:
+        """The (frozen) AgentConfig this agent was created from."""
+        return self._config
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}(agent_id={self.agent_id!r}, agent_type={self.agent_type!r}, "
+                f"funds={self.funds!r}, inventory={self.inventory!r})")
 
     def decide_action(self, market_state: MarketState) -> Optional[BidAsk]:
         """
@@ -98,6 +118,13 @@ class Agent(BaseModel):
         """
         raise NotImplementedError("Subclasses must implement decide_action")
 
+    async def decide_action_async(self, market_state: MarketState) -> Optional[BidAsk]:
+        """
+        Async variant of decide_action so agents can be driven concurrently with asyncio.gather.
+        Agents without I/O simply decide synchronously.
+        """
+        return self.decide_action(market_state)
+
     def update_state_after_transaction(self, transaction_price: float, transaction_quantity: int, is_buyer: bool):
         """
         Updates the agent's funds and inventory after a successful transaction.
@@ -126,9 +153,10 @@ class Agent(BaseModel):
 
 class RuleBasedAgent(Agent):
     """An agent that makes decisions based on simple hardcoded rules."""
+    __slots__ = ("valuation_or_cost",)
 
-    def __init__(self, config: AgentConfig, **data: Any):
-        super().__init__(config=config, **data)
+    def __init__(self, config: AgentConfig):
+        super().__init__(config=config)
         if config.valuation_or_cost is None:
             raise ValueError("RuleBasedAgent requires valuation_or_cost in its config.")
         self.valuation_or_cost = config.valuation_or_cost
@@ -168,16 +196,186 @@ class RuleBasedAgent(Agent):
         return None
 
 
+class AgentPool:
+    """
+    Struct-of-arrays view over a population of RuleBasedAgents, so a whole round
+    of rule-based decisions is computed by one compiled kernel (core._kernels)
+    instead of one Python-level decide_action call per agent.
+
+    The agents remain the source of truth for funds and inventory (they are updated
+    by transactions); the pool re-reads them at the start of every decide_all call.
+    """
+
+    # Same price bands as RuleBasedAgent.decide_action.
+    BUYER_PRICE_FACTOR_RANGE = (0.80, 0.95)
+    SELLER_PRICE_FACTOR_RANGE = (1.05, 1.20)
+
+    def __init__(self, agents: List[RuleBasedAgent], rng: Optional[np.random.Generator] = None):
+        self.agents = list(agents)
+        # Seed from the stdlib RNG by default, so random.seed(...) still makes runs reproducible
+        self.rng = rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+        n = len(self.agents)
+        self.is_buyer = np.fromiter((a.agent_type == "buyer" for a in self.agents), dtype=bool, count=n)
+        self.valuation = np.fromiter((a.valuation_or_cost for a in self.agents), dtype=np.float64, count=n)
+        self.funds = np.zeros(n, dtype=np.float64)
+        self.inventory = np.zeros(n, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+    def refresh(self) -> None:
+        """Copies current funds/inventory from the agents into the pool arrays."""
+        n = len(self.agents)
+        self.funds = np.fromiter((a.funds or 0.0 for a in self.agents), dtype=np.float64, count=n)
+        self.inventory = np.fromiter((a.inventory or 0 for a in self.agents), dtype=np.int64, count=n)
+
+    def decide_all(self, market_state: MarketState) -> List[BidAsk]:
+        """
+        Decides the actions of every agent in the pool for this round, following
+        the same rules as RuleBasedAgent.decide_action (quantity is always 1).
+
+        Returns:
+            List[BidAsk]: The bids and asks placed, in pool order. Agents that don't act are skipped.
+        """
+        if not self.agents:
+            return []
+        # Imported on first use: loading numba is slow, and only pooled rule-based decisions need it.
+        from ._kernels import decide_rule_based
+        self.refresh()
+
+        n = len(self.agents)
+        prices = np.empty(n, dtype=np.float64)
+        can_act = np.empty(n, dtype=bool)
+        decide_rule_based(
+            self.funds, self.inventory, self.valuation, self.is_buyer, self.rng.random(n),
+            *self.BUYER_PRICE_FACTOR_RANGE, *self.SELLER_PRICE_FACTOR_RANGE,
+            prices, can_act
+        )
+
+        actions: List[BidAsk] = []
+        for i in np.flatnonzero(can_act):
+            agent = self.agents[i]
+            actions.append(BidAsk(
+                agent_id=agent.agent_id,
+                bid_ask_type="bid" if self.is_buyer[i] else "ask",
+                price=float(prices[i]),
+                quantity=1,
+                round=market_state.current_round
+            ))
+        return actions
+
+
+# Placeholders an LLMAgent prompt template may reference (str.format syntax).
+PROMPT_TEMPLATE_FIELDS = frozenset({
+    "current_round",
+    "agent_funds",
+    "agent_inventory",
+    "valuation",
+    "cost",
+    "recent_transactions_summary",
+    "market_bids_summary",
+    "market_asks_summary",
+})
+
+def _make_renderer(template: str, static_fields: Dict[str, Any]) -> Optional[Callable[..., str]]:
+    """
+    Compiles a str.format template into a function that renders it with a single f-string.
+    The static fields are bound as globals; the remaining PROMPT_TEMPLATE_FIELDS are keyword
+    parameters. Returns None for templates this cannot compile (malformed, unknown fields, or
+    format specs with nested fields or quotes), which are then rendered with format_map.
+    """
+    try:
+        parsed = list(Formatter().parse(template))
+    except ValueError:
+        return None
+    pieces = []
+    for literal, field, spec, conversion in parsed:
+        if literal:
+            pieces.append(repr(literal))
+        if field is None:
+            continue
+        if field not in PROMPT_TEMPLATE_FIELDS or any(char in spec for char in "{}\\'\""):
+            return None
+        replacement = field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "")
+        pieces.append("f" + repr("{" + replacement + "}"))
+    params = ", ".join(sorted(PROMPT_TEMPLATE_FIELDS - static_fields.keys()))
+    source = f"def render(*, {params}):\n    return {' '.join(pieces) or repr('')}\n"
+    namespace = dict(static_fields)
+    exec(compile(source, "<prompt template>", "exec"), namespace)
+    return namespace["render"]
+
+# How long decide_action_async waits for the LLM before using the rule-based fallback.
+DEFAULT_LATENCY_BUDGET_MS = 10_000
+
+# Returned by a response parser when the LLM chose to PASS.
+PASS_ACTION = object()
+
+# An LLM response is one of {"action": "BID"|"ASK", "price": ..., "quantity": ...} or
+# {"action": "PASS"}, with the action in any case. Each agent type gets a parser generated from this template with
+# its own action inlined, so the other side's action is rejected in a single branch.
+# A parser returns PASS_ACTION, a (price, quantity) tuple, or a str describing why the
+# response was rejected. bool is a subclass of int, so it is excluded by the exact type
+# checks; integral float quantities (2.0) are accepted.
+_PARSER_TEMPLATE = """
+def parse(data):
+    action = data.get("action")
+    if type(action) is str:
+        action = action.upper()
+    if action == "{own}":
+        price = data.get("price")
+        if type(price) is not int and type(price) is not float or price <= 0:
+            return f"invalid price {{price!r}}"
+        quantity = data.get("quantity")
+        if type(quantity) is float and quantity.is_integer():
+            quantity = int(quantity)
+        if type(quantity) is not int or quantity < 1:
+            return f"invalid quantity {{quantity!r}}"
+        return (float(price), quantity)
+    if action == "PASS":
+        return PASS_ACTION
+    if action == "{other}":
+        return "action '{other_lower}' inconsistent with agent type '{agent_type}'"
+    return f"invalid action {{action!r}}"
+"""
+
+@lru_cache(maxsize=None)
+def _make_parser(agent_type: Literal["buyer", "seller"]) -> Callable[[Dict[str, Any]], Any]:
+    """Generates the LLM response parser for agent_type (see _PARSER_TEMPLATE)."""
+    own, other = ("BID", "ASK") if agent_type == "buyer" else ("ASK", "BID")
+    source = _PARSER_TEMPLATE.format(own=own, other=other, other_lower=other.lower(), agent_type=agent_type)
+    namespace: Dict[str, Any] = {"PASS_ACTION": PASS_ACTION}
+    exec(compile(source, f"<llm response parser: {agent_type}>", "exec"), namespace)
+    return namespace["parse"]
+
 class LLMAgent(Agent):
     """An agent that uses an LLM to make decisions."""
+    __slots__ = ("llm_persona_prompt_key", "llm_client", "prompt_manager", "latency_budget_ms", "fallback",
+                 "_template", "_unknown_template_fields", "_static_fields", "_render", "_parse")
 
-    def __init__(self, config: AgentConfig, llm_client: Any, prompt_manager: Any, **data: Any):
-        super().__init__(config=config, **data)
+    def __init__(self, config: AgentConfig, llm_client: Any, prompt_manager: Any,
+                 latency_budget_ms: float = DEFAULT_LATENCY_BUDGET_MS):
+        super().__init__(config=config)
         if not config.llm_persona_prompt_key:
             raise ValueError("LLMAgent requires llm_persona_prompt_key in its config.")
         self.llm_persona_prompt_key = config.llm_persona_prompt_key
         self.llm_client = llm_client # Injected dependency
         self.prompt_manager = prompt_manager # Injected dependency
+        self.latency_budget_ms = latency_budget_ms
+        # Rule-based stand-in used by decide_action_async when the LLM is late or unusable.
+        # It needs a valuation/cost, so agents configured without one have no fallback.
+        self.fallback: Optional[RuleBasedAgent] = (
+            RuleBasedAgent(config=config) if config.valuation_or_cost is not None else None
+        )
+        self._parse = _make_parser(self.agent_type)
+        # The prompt template and the fields that never change for this agent are
+        # resolved once here rather than on every decision.
+        self._template = self._load_prompt_template()
+        self._unknown_template_fields = self._find_unknown_template_fields()
+        self._static_fields = {
+            "valuation": config.valuation_or_cost if self.agent_type == "buyer" else "N/A",
+            "cost": config.valuation_or_cost if self.agent_type == "seller" else "N/A",
+        }
+        self._render = _make_renderer(self._template, self._static_fields) if self._template else None
 
     def _format_market_summary(self, items: List[BidAsk], top_n: int = 3) -> str:
         if not items:
@@ -198,41 +396,48 @@ class LLMAgent(Agent):
             summary.append(f"  - Price: {tx.price:.2f}, Qty: {tx.quantity}, Round: {tx.round}")
         return "\n".join(summary)
 
-    def decide_action(self, market_state: MarketState) -> Optional[BidAsk]:
+    def _load_prompt_template(self) -> Optional[str]:
         """
-        Uses the LLM to decide an action.
-        This involves:
-        1. Getting the base prompt using prompt_manager.
-        2. Formatting the prompt with current market_state and agent state.
-        3. Sending the prompt to the LLM via llm_client.
-        4. Parsing the LLM's response to create a BidAsk object.
+        Fetches this agent's assembled prompt template (persona, instructions and
+        output_format_notes) from the prompt_manager. The prompt_manager caches it per
+        persona key, so agents sharing a persona share one template.
         """
-        # This is a simplified placeholder for Phase 2.
-        # Actual implementation will involve calling prompt_manager and llm_client.
-        
-        prompt_template = self.prompt_manager.get_prompt(
-            self.llm_persona_prompt_key,
-            agent_type=self.agent_type
-        )
-        if not prompt_template:
+        return self.prompt_manager.render_static(self.llm_persona_prompt_key)
+
+    def _find_unknown_template_fields(self) -> set:
+        """Returns the template placeholders that build_prompt cannot fill."""
+        if self._template is None:
+            return set()
+        try:
+            fields = {field for _, field, _, _ in Formatter().parse(self._template) if field is not None}
+        except ValueError:
+            return set() # Malformed template; reported when rendering in build_prompt
+        return fields - PROMPT_TEMPLATE_FIELDS
+
+    def build_prompt(self, market_state: MarketState) -> Optional[str]:
+        """
+        Builds the full prompt text for this agent from its cached prompt template
+        and the current market_state. Does not call the LLM.
+
+        Returns:
+            Optional[str]: The assembled prompt, or None if the prompt could not be built.
+        """
+        if self._template is None:
             print(f"Error: Could not find prompt for key {self.llm_persona_prompt_key}")
             return None
+        if self._unknown_template_fields:
+            logging.error(
+                f"Prompt for key {self.llm_persona_prompt_key} uses unknown placeholders "
+                f"{sorted(self._unknown_template_fields)} for agent {self.agent_id}."
+            )
+            return None
 
-        # Prepare context for the prompt
-        context = {
+        # Only the fields that change from round to round are computed here;
+        # valuation/cost come from the per-agent static fields.
+        dynamic_fields = {
             "current_round": market_state.current_round,
             "agent_funds": self.funds,
             "agent_inventory": self.inventory,
-            "valuation": (
-                self._config.valuation_or_cost
-                if self.agent_type == "buyer"
-                else "N/A"
-            ),
-            "cost": (
-                self._config.valuation_or_cost
-                if self.agent_type == "seller"
-                else "N/A"
-            ),
             "recent_transactions_summary": self._format_transaction_summary(
                 market_state.transaction_log
             ),
@@ -243,57 +448,29 @@ class LLMAgent(Agent):
                 [a for a in market_state.asks if a.bid_ask_type == 'ask']
             ),
         }
-        
+
         try:
-            instructions_template_str: Optional[str] = None
-            if isinstance(prompt_template, dict) and "instructions" in prompt_template:
-                instructions_template_str = prompt_template["instructions"]
-            elif isinstance(prompt_template, str):
-                instructions_template_str = prompt_template # The whole thing is the instruction
-            else:
-                logging.error(f"Prompt for key {self.llm_persona_prompt_key} is not a string or expected dict.")
-                return None
-
-            if instructions_template_str is None: # Should be caught above, but defensive
-                 logging.error(
-                     f"Could not extract instruction string for agent {self.agent_id} "
-                     f"from prompt: {prompt_template}"
-                 )
-                 return None
-
-            try:
-                template = Template(instructions_template_str)
-                formatted_instructions = template.render(context)
-            except Exception as e:
-                logging.error(f"Error rendering prompt template for agent {self.agent_id}: {e}")
-                # Allow the broader try-except to catch if it leads to failure or handle more directly
-                # For now, logging and letting it proceed. If rendering fails, formatted_instructions won't be set.
-                # This could lead to an UnboundLocalError if not handled.
-                # A safer approach:
-                # self.log_decision_error(f"Failed to render prompt template: {e}") # if such a method exists
-                return None # Exit if template rendering fails
-
-            # Assemble full prompt text
-            full_prompt_text = formatted_instructions
-            if isinstance(prompt_template, dict):
-                if "persona" in prompt_template:
-                    full_prompt_text = f"{prompt_template['persona']}\n\n{full_prompt_text}"
-                if "output_format_notes" in prompt_template:
-                    full_prompt_text = f"{full_prompt_text}\n\n{prompt_template['output_format_notes']}"
-            
-            # The variable 'formatted_prompt' is now 'full_prompt_text'
-            # Ensure subsequent code uses 'full_prompt_text'
-
-        except KeyError as e: # This might still be relevant if prompt_template dict access fails for persona/output_format
-            logging.error(f"Error accessing parts of prompt {self.llm_persona_prompt_key}: Missing key {e}")
-            return None
-        except Exception as e:
-            logging.error(f"An unexpected error occurred during prompt assembly for agent {self.agent_id}: {e}")
+            if self._render is not None:
+                return self._render(**dynamic_fields)
+            return self._template.format_map(ChainMap(dynamic_fields, self._static_fields))
+        except (ValueError, IndexError, AttributeError, TypeError) as e:
+            logging.error(f"Error rendering prompt template for agent {self.agent_id}: {e}")
             return None
 
+    def decide_action(self, market_state: MarketState) -> Optional[BidAsk]:
+        """
+        Uses the LLM to decide an action.
+        This involves:
+        1. Building the prompt from the persona template and market_state (build_prompt).
+        2. Sending the prompt to the LLM via llm_client.
+        3. Parsing the LLM's response to create a BidAsk object (parse_response).
+        """
+        full_prompt_text = self.build_prompt(market_state)
+        if full_prompt_text is None:
+            return None
 
         # print(f"--- LLM Agent {self.agent_id} Prompt for Round {market_state.current_round} ---")
-        # print(formatted_prompt)
+        # print(full_prompt_text)
         # print("--------------------------------------------------------------------")
 
         try:
@@ -305,163 +482,171 @@ class LLMAgent(Agent):
             )
             return None
 
+        return self.parse_response(llm_response_text, market_state)
+
+    async def decide_action_async(self, market_state: MarketState) -> Optional[BidAsk]:
+        """
+        Same as decide_action, but awaits llm_client.generate_text_async so that
+        several agents' LLM calls can be in flight at once.
+        While the call is in flight the rule-based fallback's action is computed speculatively;
+        it is returned instead if the LLM misses latency_budget_ms. LLM errors and invalid
+        responses return None, as in decide_action, so the simulation reports them.
+        """
+        full_prompt_text = self.build_prompt(market_state)
+        if full_prompt_text is None:
+            return None
+
+        llm_task = asyncio.ensure_future(self.llm_client.generate_text_async(prompt=full_prompt_text))
+        speculative_action = self._fallback_action(market_state)
+        try:
+            llm_response_text = await asyncio.wait_for(llm_task, timeout=self.latency_budget_ms / 1000)
+        except asyncio.TimeoutError:
+            logging.warning(
+                f"LLM Agent {self.agent_id} got no LLM response within {self.latency_budget_ms} ms; "
+                f"using the rule-based fallback."
+            )
+            return speculative_action
+        except Exception as e:
+            logging.error(
+                f"LLM Agent {self.agent_id} encountered an unexpected error during async LLM call: {e}. "
+                f"Prompt: '{full_prompt_text}'"
+            )
+            return None
+
+        return self.parse_response(llm_response_text, market_state)
+
+    def _fallback_action(self, market_state: MarketState) -> Optional[BidAsk]:
+        """Decides this agent's action with its rule-based fallback, from the agent's current state."""
+        if self.fallback is None:
+            return None
+        self.fallback.funds = self.funds
+        self.fallback.inventory = self.inventory
+        return self.fallback.decide_action(market_state)
+
+    def parse_response(self, llm_response_text: Optional[str], market_state: MarketState) -> Optional[BidAsk]:
+        """
+        Parses a raw LLM response into a BidAsk for this agent.
+        Returns None for PASS, missing or invalid responses, and actions the agent cannot afford.
+        """
         if not llm_response_text:
             print(f"LLM Agent {self.agent_id} received no response from LLM.")
             return None
 
         # print(f"LLM Agent {self.agent_id} Response: {llm_response_text}")
 
-        # Parse the LLM response as JSON
-        action_type_str: Optional[str] = None
-        price_val: Optional[float] = None
-        quantity_val: Optional[int] = None
-
+        # Parse the LLM response as JSON. Decoding is the only step that can raise;
+        # the shape of the result is then checked by the agent type's generated parser.
         try:
-            data = json.loads(llm_response_text)
-            
-            action = data.get("action")
-            # Ensure price and quantity are retrieved correctly, even if they are null in JSON
-            raw_price = data.get("price")
-            raw_quantity = data.get("quantity")
-
-            if isinstance(action, str):
-                action_type_str = action.lower()
-            else:
-                logging.warning(
-                    f"LLM Agent {self.agent_id} received invalid 'action' type or "
-                    f"it's missing: {action}. Response: '{llm_response_text}'"
-                )
-                return None
-
-            if action_type_str == "pass":
-                price_val = None
-                quantity_val = None
-            else:
-                # Validate action type against agent type early
-                if (action_type_str == "bid" and self.agent_type != "buyer") or \
-                   (action_type_str == "ask" and self.agent_type != "seller"):
-                    logging.warning(
-                        f"LLM Agent {self.agent_id} proposed action '{action_type_str}' "
-                        f"inconsistent with agent type '{self.agent_type}'. "
-                        f"Response: '{llm_response_text}'"
-                    )
-                    return None
-
-                if raw_price is not None:
-                    try:
-                        price_val = float(raw_price)
-                        if price_val <= 0:
-                            logging.warning(
-                                f"LLM Agent {self.agent_id} provided non-positive price: "
-                                f"{price_val} for action {action_type_str}. "
-                                f"Response: '{llm_response_text}'"
-                            )
-                            return None
-                    except (ValueError, TypeError):
-                        logging.warning(
-                            f"LLM Agent {self.agent_id} received invalid 'price' format: "
-                            f"{raw_price} for action {action_type_str}. "
-                            f"Response: '{llm_response_text}'"
-                        )
-                        return None
-                else: # Price is required for non-pass actions
-                    logging.warning(
-                        f"LLM Agent {self.agent_id} 'price' is missing for action "
-                        f"{action_type_str}. Response: '{llm_response_text}'"
-                    )
-                    return None
-
-                if raw_quantity is not None:
-                    try:
-                        quantity_val = int(raw_quantity)
-                        if quantity_val <= 0:
-                            logging.warning(
-                                f"LLM Agent {self.agent_id} provided non-positive quantity: "
-                                f"{quantity_val} for action {action_type_str}. "
-                                f"Response: '{llm_response_text}'"
-                            )
-                            return None
-                    except (ValueError, TypeError):
-                        logging.warning(
-                            f"LLM Agent {self.agent_id} received invalid 'quantity' format: "
-                            f"{raw_quantity} for action {action_type_str}. "
-                            f"Response: '{llm_response_text}'"
-                        )
-                        return None
-                else: # Quantity is required for non-pass actions
-                    logging.warning(
-                        f"LLM Agent {self.agent_id} 'quantity' is missing for action "
-                        f"{action_type_str}. Response: '{llm_response_text}'"
-                    )
-                    return None
-            
-        except json.JSONDecodeError as e:
+            data = orjson.loads(llm_response_text)
+        except orjson.JSONDecodeError as e:
             logging.error(
                 f"LLM Agent {self.agent_id} failed to decode LLM response JSON: {e}. "
                 f"Response: '{llm_response_text}'"
             )
             return None
-        except KeyError as e: # Should be caught by .get() with default None, but good for completeness if direct access was used.
-            logging.error(
-                f"LLM Agent {self.agent_id} missing expected key in LLM response JSON: {e}. "
-                f"Response: '{llm_response_text}'"
-            )
-            return None
-        except Exception as e: # Catch any other unexpected errors during parsing/validation
-            logging.error(
-                f"Unexpected error processing LLM response for agent {self.agent_id}: {e}. "
+
+        if not isinstance(data, dict):
+            logging.warning(
+                f"LLM Agent {self.agent_id} received a non-object LLM response. "
                 f"Response: '{llm_response_text}'"
             )
             return None
 
-        # If action is "pass", return None (no BidAsk object)
-        if action_type_str == "pass":
+        parsed = self._parse(data)
+        if parsed is PASS_ACTION:
             logging.info(f"LLM Agent {self.agent_id} chose to PASS.")
             return None
-
-        # At this point, for non-PASS actions, action_type_str, price_val, and quantity_val should be valid and positive.
-        # The validation logic for funds and inventory remains.
-        if action_type_str and price_val is not None and quantity_val is not None: # price_val and quantity_val already validated > 0 for non-pass actions
-            if action_type_str == "bid": # Already validated agent_type is "buyer"
-                if self.funds is not None and self.funds >= price_val * quantity_val:
-                    return BidAsk(
-                        agent_id=self.agent_id,
-                        bid_ask_type="bid",
-                        price=price_val,
-                        quantity=quantity_val,
-                        round=market_state.current_round
-                    )
-                else:
-                    logging.info(
-                        f"LLM Agent {self.agent_id} wanted to bid {quantity_val} at {price_val} "
-                        f"but has insufficient funds ({self.funds})."
-                    )
-                    return None
-            elif action_type_str == "ask": # Already validated agent_type is "seller"
-                if self.inventory is not None and self.inventory >= quantity_val:
-                    return BidAsk(
-                        agent_id=self.agent_id,
-                        bid_ask_type="ask",
-                        price=price_val,
-                        quantity=quantity_val,
-                        round=market_state.current_round
-                    )
-                else:
-                    logging.info(
-                        f"LLM Agent {self.agent_id} wanted to ask {quantity_val} at {price_val} "
-                        f"but has insufficient inventory ({self.inventory})."
-                    )
-                    return None
-            # No 'else' needed here as inconsistent action_type/agent_type is handled above.
-        else:
-            # This path should ideally not be reached if logic above is correct for non-PASS actions.
-            # It might be reached if action_type_str was valid but price/quantity became None unexpectedly (e.g. if not "pass" but price/qty were null).
+        if type(parsed) is str:
             logging.warning(
-                f"LLM Agent {self.agent_id} reached end of decision logic without "
-                f"valid action. Action: {action_type_str}, Price: {price_val}, "
-                f"Qty: {quantity_val}. LLM Response: '{llm_response_text}'"
+                f"LLM Agent {self.agent_id} rejected the LLM response: {parsed}. "
+                f"Response: '{llm_response_text}'"
+            )
+            return None
+
+        price_val, quantity_val = parsed
+        # The parser only accepts this agent's own side: bids for buyers, asks for sellers.
+        if self.agent_type == "buyer":
+            if self.funds is not None and self.funds >= price_val * quantity_val:
+                return BidAsk(
+                    agent_id=self.agent_id,
+                    bid_ask_type="bid",
+                    price=price_val,
+                    quantity=quantity_val,
+                    round=market_state.current_round
+                )
+            logging.info(
+                f"LLM Agent {self.agent_id} wanted to bid {quantity_val} at {price_val} "
+                f"but has insufficient funds ({self.funds})."
             )
             return None
+        if self.inventory is not None and self.inventory >= quantity_val:
+            return BidAsk(
+                agent_id=self.agent_id,
+                bid_ask_type="ask",
+                price=price_val,
+                quantity=quantity_val,
+                round=market_state.current_round
+            )
+        logging.info(
+            f"LLM Agent {self.agent_id} wanted to ask {quantity_val} at {price_val} "
+            f"but has insufficient inventory ({self.inventory})."
+        )
+        return None
+
+def decide_actions_batch(agents: List[LLMAgent], market_state: MarketState, llm_client: Any) -> List[Optional[BidAsk]]:
+    """
+    Decides actions for several LLM agents with a single call to
+    llm_client.generate_text_batch instead of one generate_text call per agent.
+
+    Args:
+        agents (List[LLMAgent]): The agents deciding in this round.
+        market_state (MarketState): The market state shared by all agents.
+        llm_client (Any): Client exposing generate_text_batch(prompts) -> list of responses.
+
+    Returns:
+        List[Optional[BidAsk]]: One entry per agent, in the same order as `agents`.
+    """
+    actions: List[Optional[BidAsk]] = [None] * len(agents)
+    prompted_indices: List[int] = []
+    prompts: List[str] = []
+    for i, agent in enumerate(agents):
+        prompt = agent.build_prompt(market_state)
+        if prompt is not None:
+            prompted_indices.append(i)
+            prompts.append(prompt)
+
+    if not prompts:
+        return actions
+
+    try:
+        responses = llm_client.generate_text_batch(prompts)
+    except Exception as e:
+        logging.error(f"Batched LLM call for {len(prompts)} agents encountered an unexpected error: {e}")
+        return actions
+
+    if responses is None or len(responses) != len(prompts):
+        logging.error(
+            f"Batched LLM call returned {0 if responses is None else len(responses)} "
+            f"responses for {len(prompts)} prompts."
+        )
+        return actions
+
+    for i, response_text in zip(prompted_indices, responses):
+        actions[i] = agents[i].parse_response(response_text, market_state)
+    return actions
+
+async def _gather_actions_async(agents: List[Agent], market_state: MarketState) -> List[Optional[BidAsk]]:
+    return list(await asyncio.gather(*[agent.decide_action_async(market_state) for agent in agents]))
+
+def run_round(agents: List[Agent], market_state: MarketState) -> List[Optional[BidAsk]]:
+    """
+    Decides actions for all agents concurrently via asyncio.gather, so the round
+    costs roughly the slowest LLM call rather than the sum of all of them.
+
+    Returns:
+        List[Optional[BidAsk]]: One entry per agent, in the same order as `agents`.
+    """
+    return asyncio.run(_gather_actions_async(agents, market_state))
 
 # Example of how AgentConfig might be used with Agent (conceptual for now)
 # if __name__ == "__main__":
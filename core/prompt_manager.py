@@ -1,6 +1,6 @@
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 # Base directory for prompts, relative to the project root.
 PROMPT_CONFIG_BASE_DIR = "config/prompts"
@@ -78,6 +78,64 @@ def get_prompt(prompt_key: str, module_name: str = "marketplace") -> Optional[Di
 
     return prompt_data
 
+def _escape_braces(text: str) -> str:
+    """Escapes text so str.format leaves it unchanged."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+def assemble_template(prompt_data: Any) -> Optional[str]:
+    """
+    Assembles a loaded prompt into a single str.format template: persona, instructions and
+    output_format_notes joined by blank lines. Only the instructions keep their placeholders;
+    persona and notes are escaped. A plain string prompt is used as the instructions.
+
+    Returns:
+        Optional[str]: The template, or None if the prompt is missing or malformed.
+    """
+    if not prompt_data:
+        return None
+    if isinstance(prompt_data, str):
+        return prompt_data
+    if not isinstance(prompt_data, dict) or "instructions" not in prompt_data:
+        print("Error: Prompt is not a string or a dict with 'instructions'.")
+        return None
+
+    parts = []
+    if "persona" in prompt_data:
+        parts.append(_escape_braces(prompt_data["persona"]))
+    parts.append(prompt_data["instructions"])
+    if "output_format_notes" in prompt_data:
+        parts.append(_escape_braces(prompt_data["output_format_notes"]))
+    return "\n\n".join(parts)
+
+# Assembled templates by (module_name, prompt_key). Only successful loads are stored, so a
+# prompt that is missing or broken on first access is retried on the next call.
+_static_templates: Dict[Tuple[str, str], str] = {}
+
+def render_static(prompt_key: str, module_name: str = "marketplace") -> Optional[str]:
+    """
+    Returns the assembled prompt template for prompt_key (see assemble_template).
+    Cached, so all agents sharing a persona key load and assemble the YAML once; each agent
+    then only fills in its own values. Call clear_static_cache() to pick up edited prompts.
+
+    Args:
+        prompt_key (str): The key or name of the prompt file (e.g., "buyer_default").
+        module_name (str): The module directory under PROMPT_CONFIG_BASE_DIR.
+
+    Returns:
+        Optional[str]: The template, or None if the prompt could not be loaded.
+    """
+    cache_key = (module_name, prompt_key)
+    template = _static_templates.get(cache_key)
+    if template is None:
+        template = assemble_template(get_prompt(prompt_key, module_name=module_name))
+        if template is not None:
+            _static_templates[cache_key] = template
+    return template
+
+def clear_static_cache() -> None:
+    """Drops the templates cached by render_static, so prompts are reloaded from disk."""
+    _static_templates.clear()
+
 # Example usage (for testing this file directly):
 if __name__ == "__main__":
     print(f"Project root directory: {PROJECT_ROOT}")
@@ -1,6 +1,7 @@
 # Component of Phase 1: Core Simulation Logic & Rule-Based Agents
 from typing import List, Dict, Any, Optional, Tuple
-from .models import Agent, MarketState, BidAsk, Transaction, AgentConfig, RuleBasedAgent, LLMAgent
+from dataclasses import replace
+from .models import Agent, MarketState, BidAsk, Transaction, AgentConfig, RuleBasedAgent, LLMAgent, AgentPool, decide_actions_batch, run_round
 # from .llm_client import generate_text # Not directly used by engine, but by LLMAgent
 # from .prompt_manager import get_prompt # Not directly used by engine, but by LLMAgent
 import random # For shuffling agents
@@ -22,11 +23,16 @@ class MarketSimulation:
         self.market_state = MarketState(current_round=0)
         self.simulation_history: List[MarketState] = [] # To store state after each round
         self.llm_operational_error: Optional[str] = None # To store the first LLM operational error
+        # Plain RuleBasedAgents are decided together, vectorized over the whole population.
+        # Subclasses may override decide_action, so they keep the per-agent path.
+        self.rule_based_pool = AgentPool([agent for agent in agents if type(agent) is RuleBasedAgent])
 
     def _gather_actions_from_agents(self) -> List[BidAsk]:
         """
         Collects bids and asks from all agents for the current round.
-        Agents' decisions are made sequentially in a random order to avoid bias.
+        Rule-based agents are decided together by rule_based_pool, and LLM agents are
+        decided by _decide_llm_actions (concurrent or batched LLM calls). Any other agent
+        decides on its own. Actions are collected in a random agent order to avoid bias.
         """
         actions: List[BidAsk] = []
         # Shuffle agents to vary the order of decision-making each round
@@ -35,10 +41,24 @@ class MarketSimulation:
         # For now, it's good practice.
         shuffled_agents = random.sample(self.agents, len(self.agents))
 
+        # LLM agents sharing a client are decided together (concurrent or one
+        # batched LLM call) instead of one round trip per agent.
+        llm_actions = self._decide_llm_actions(
+            [agent for agent in shuffled_agents if isinstance(agent, LLMAgent)]
+        )
+
+        pooled_ids = {agent.agent_id for agent in self.rule_based_pool.agents}
+        pool_actions = {action.agent_id: action for action in self.rule_based_pool.decide_all(self.market_state)}
+
         for agent in shuffled_agents:
-            # Pass a copy of the market state so agents can't directly mutate the shared state
-            # during their decision process.
-            action = agent.decide_action(self.market_state.copy(deep=True))
+            if isinstance(agent, LLMAgent):
+                action = llm_actions.get(agent.agent_id)
+            elif agent.agent_id in pooled_ids:
+                action = pool_actions.get(agent.agent_id)
+            else:
+                # MarketState is frozen, so agents can't mutate the shared state
+                # during their decision process.
+                action = agent.decide_action(self.market_state)
             
             if action:
                 # Basic validation: buyer bids, seller asks
@@ -61,6 +81,35 @@ class MarketSimulation:
                 # print(f"DEBUG: LLM Error recorded: {self.llm_operational_error}") # For debugging
         return actions
 
+    def _decide_llm_actions(self, llm_agents: List[LLMAgent]) -> Dict[str, Optional[BidAsk]]:
+        """
+        Decides actions for all LLM agents, grouped by llm_client. Each group uses concurrent
+        async calls if the client supports generate_text_async (this is the path core.llm_client
+        takes, and the only one with the agents' latency budget and rule-based fallback),
+        otherwise one batched call if it supports generate_text_batch, otherwise sequential calls.
+        Returns a mapping of agent_id to the agent's action (None if it made no valid action).
+        """
+        agents_by_client: Dict[int, List[LLMAgent]] = {}
+        for agent in llm_agents:
+            agents_by_client.setdefault(id(agent.llm_client), []).append(agent)
+
+        llm_actions: Dict[str, Optional[BidAsk]] = {}
+        if not agents_by_client:
+            return llm_actions
+
+        market_state = self.market_state # Frozen, so every group can share it
+        for client_agents in agents_by_client.values():
+            llm_client = client_agents[0].llm_client
+            if hasattr(llm_client, "generate_text_async"):
+                actions = run_round(client_agents, market_state)
+            elif hasattr(llm_client, "generate_text_batch"):
+                actions = decide_actions_batch(client_agents, market_state, llm_client)
+            else:
+                actions = [agent.decide_action(market_state) for agent in client_agents]
+            for agent, action in zip(client_agents, actions):
+                llm_actions[agent.agent_id] = action
+        return llm_actions
+
     def _match_orders_simple_CDA(self, bids: List[BidAsk], asks: List[BidAsk]) -> List[Transaction]:
         """
         A simplified continuous double auction (CDA) matching engine.
@@ -151,7 +200,7 @@ class MarketSimulation:
         5. Update agent states (funds, inventory).
         6. Store the market state for this round.
         """
-        self.market_state.current_round += 1
+        self.market_state = replace(self.market_state, current_round=self.market_state.current_round + 1)
         # print(f"\n--- Starting Round {self.market_state.current_round} ---")
 
         # Get actions from agents based on the state *before* this round's trades
@@ -160,37 +209,36 @@ class MarketSimulation:
         current_bids = [action for action in all_actions if action.bid_ask_type == "bid"]
         current_asks = [action for action in all_actions if action.bid_ask_type == "ask"]
         
-        # Update market state with the new bids and asks for this round
-        self.market_state.bids = current_bids
-        self.market_state.asks = current_asks
-        
         # Match orders
         transactions_this_round = self._match_orders_simple_CDA(current_bids, current_asks)
         
-        # Update market state with transactions
-        self.market_state.transaction_log.extend(transactions_this_round)
-        
         # Update price history (e.g., average transaction price this round)
+        price_history = self.market_state.price_history
         if transactions_this_round:
             avg_price_this_round = sum(tx.price * tx.quantity for tx in transactions_this_round) / sum(tx.quantity for tx in transactions_this_round)
             total_volume_this_round = sum(tx.quantity for tx in transactions_this_round)
-            self.market_state.price_history.append({
+            price_history += ({
                 "round": self.market_state.current_round,
                 "average_price": round(avg_price_this_round, 2),
                 "volume": total_volume_this_round,
                 "num_transactions": len(transactions_this_round)
-            })
+            },)
             # print(f"Round {self.market_state.current_round} Transactions: {len(transactions_this_round)}, Avg Price: {avg_price_this_round:.2f}, Volume: {total_volume_this_round}")
 
+        # Update market state with this round's bids, asks and transactions
+        self.market_state = replace(
+            self.market_state,
+            bids=tuple(current_bids),
+            asks=tuple(current_asks),
+            transaction_log=self.market_state.transaction_log + tuple(transactions_this_round),
+            price_history=price_history,
+        )
+
         # Update agent states (funds, inventory) based on these transactions
         self._update_agent_states(transactions_this_round)
 
-        # Store a deep copy of the market state for this round's history
-        self.simulation_history.append(self.market_state.copy(deep=True))
-
-        # Clear bids and asks for the next round (as agents will submit new ones)
-        # self.market_state.bids = [] # Agents resubmit each round
-        # self.market_state.asks = [] # Agents resubmit each round
+        # Store the market state for this round's history (immutable, so no copy is needed)
+        self.simulation_history.append(self.market_state)
 
 
     def run_simulation(self) -> Tuple[List[MarketState], Optional[str]]:
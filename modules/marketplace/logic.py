@@ -40,7 +40,7 @@ def setup_simulation_agents(
             specific_buyer_config["valuation_or_cost"] = round(random.uniform(min_val, max_val), 2)
             del specific_buyer_config["valuation_or_cost_range"] # Remove range after use
 
-        config = AgentConfig(**specific_buyer_config)
+        config = AgentConfig.from_dict(specific_buyer_config)
         if agent_type == "rule_based":
             agents.append(RuleBasedAgent(config=config))
         elif agent_type == "llm":
@@ -49,7 +49,7 @@ def setup_simulation_agents(
             # Ensure llm_persona_prompt_key is set, e.g. from buyer_config_template
             if "llm_persona_prompt_key" not in specific_buyer_config:
                  specific_buyer_config["llm_persona_prompt_key"] = DEFAULT_BUYER_PROMPT_KEY # Default if not specified
-            config_llm = AgentConfig(**specific_buyer_config) # Re-create with potentially added key
+            config_llm = AgentConfig.from_dict(specific_buyer_config) # Re-create with potentially added key
             agents.append(LLMAgent(config=config_llm, llm_client=llm_client_instance, prompt_manager=prompt_manager_instance))
         else:
             raise ValueError(f"Unsupported agent type: {agent_type}")
@@ -68,7 +68,7 @@ def setup_simulation_agents(
             specific_seller_config["valuation_or_cost"] = round(random.uniform(min_cost, max_cost), 2)
             del specific_seller_config["valuation_or_cost_range"]
 
-        config = AgentConfig(**specific_seller_config)
+        config = AgentConfig.from_dict(specific_seller_config)
         if agent_type == "rule_based":
             agents.append(RuleBasedAgent(config=config))
         elif agent_type == "llm":
@@ -76,7 +76,7 @@ def setup_simulation_agents(
                 raise ValueError("LLMClient and PromptManager instances are required for LLMAgents.")
             if "llm_persona_prompt_key" not in specific_seller_config:
                  specific_seller_config["llm_persona_prompt_key"] = DEFAULT_SELLER_PROMPT_KEY # Default if not specified
-            config_llm = AgentConfig(**specific_seller_config)
+            config_llm = AgentConfig.from_dict(specific_seller_config)
             agents.append(LLMAgent(config=config_llm, llm_client=llm_client_instance, prompt_manager=prompt_manager_instance))
         else:
             raise ValueError(f"Unsupported agent type: {agent_type}")
@@ -169,15 +169,19 @@ def process_simulation_results_for_display(simulation_history: List[MarketState]
             results["volumes"].append(0)
             results["num_transactions_per_round"].append(0)
 
-        for tx in state.transaction_log:
-            if tx.round == state.current_round: # Only add transactions from the current state's round
-                 results["all_transactions"].append({
-                    "round": tx.round,
-                    "buyer_id": tx.buyer_id,
-                    "seller_id": tx.seller_id,
-                    "price": tx.price,
-                    "quantity": tx.quantity
-                })
+        # Only add transactions from the current state's round; one list comprehension per
+        # state rather than an append per transaction
+        current_round = state.current_round
+        results["all_transactions"] += [
+            {
+                "round": tx.round,
+                "buyer_id": tx.buyer_id,
+                "seller_id": tx.seller_id,
+                "price": tx.price,
+                "quantity": tx.quantity
+            }
+            for tx in state.transaction_log if tx.round == current_round
+        ]
                 
     return results
 
@@ -0,0 +1,122 @@
+import asyncio
+import copy
+
+import pytest
+
+from core.models import AgentConfig, RuleBasedAgent
+from core.prompt_manager import assemble_template
+
+
+@pytest.fixture(scope="session")
+def make_agent():
+    """
+    Factory for RuleBasedAgents. Each distinct set of config kwargs is built once per
+    session; every call returns a fresh shallow copy, so tests can mutate funds/inventory
+    without affecting each other.
+    """
+    cache = {}
+
+    def _make_agent(**config_kwargs):
+        key = frozenset(config_kwargs.items())
+        if key not in cache:
+            cache[key] = RuleBasedAgent(config=AgentConfig(**config_kwargs))
+        return copy.copy(cache[key])
+
+    return _make_agent
+
+
+class StubLLM:
+    """
+    Hand-rolled stand-in for core.llm_client. Much cheaper than a MagicMock: it answers
+    every prompt with `response` (or raises `side_effect`) and only counts calls.
+    """
+    def __init__(self, response="", side_effect=None, delay=0.0):
+        self.response = response
+        self.side_effect = side_effect
+        self.delay = delay # Seconds generate_text_async sleeps before answering
+        self.calls = 0
+        self.async_calls = 0
+        self.batches = [] # Prompt lists passed to generate_text_batch
+        self.in_flight = 0 # generate_text_async calls currently awaiting their answer
+        self.peak_in_flight = 0 # Most generate_text_async calls ever in flight at once
+
+    def generate_text(self, prompt):
+        self.calls += 1
+        if self.side_effect:
+            raise self.side_effect
+        return self.response
+
+    def generate_text_batch(self, prompts):
+        self.batches.append(prompts)
+        if self.side_effect:
+            raise self.side_effect
+        return [self.response for _ in prompts]
+
+    async def generate_text_async(self, prompt):
+        self.async_calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.side_effect:
+            raise self.side_effect
+        return self.response
+
+
+class SyncOnlyLLM:
+    """Client exposing only generate_text; calls are forwarded to (and counted by) a StubLLM."""
+    def __init__(self, llm):
+        self.llm = llm
+
+    def generate_text(self, prompt):
+        return self.llm.generate_text(prompt)
+
+
+class BatchOnlyLLM(SyncOnlyLLM):
+    """Client with generate_text_batch but no generate_text_async, so agents are batched."""
+    def generate_text_batch(self, prompts):
+        return self.llm.generate_text_batch(prompts)
+
+
+class StubPromptManager:
+    """Hand-rolled stand-in for core.prompt_manager that serves `prompt` and records each request."""
+    DEFAULT_PROMPT = {
+        "persona": "You are an agent.",
+        "instructions": "Instructions: {current_round} {agent_funds} {agent_inventory} {valuation} {cost} {recent_transactions_summary} {market_bids_summary} {market_asks_summary}",
+        "output_format_notes": "Format: JSON"
+    }
+
+    def __init__(self, prompt=DEFAULT_PROMPT):
+        self.prompt = prompt
+        self.calls = [] # prompt_key per render_static call
+
+    def render_static(self, prompt_key):
+        self.calls.append(prompt_key)
+        return assemble_template(self.prompt)
+
+
+@pytest.fixture
+def stub_llm():
+    return StubLLM()
+
+
+@pytest.fixture
+def stub_prompt_manager():
+    return StubPromptManager()
+
+
+@pytest.fixture
+def make_llm_client():
+    """
+    Factory for LLM clients: make(kind, response) -> (client, stub). An "async" client is a full
+    StubLLM, a "batch" client has no generate_text_async and a "sync" client only has generate_text.
+    Every call is counted on the returned StubLLM.
+    """
+    def _make(kind, response=""):
+        stub = StubLLM(response=response)
+        wrappers = {"async": lambda llm: llm, "batch": BatchOnlyLLM, "sync": SyncOnlyLLM}
+        return wrappers[kind](stub), stub
+
+    return _make
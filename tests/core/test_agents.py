@@ -1,38 +1,37 @@
 import pytest
 import sys
-import os
+import time
+import asyncio
+import importlib
 
-# Add project root to sys.path to allow importing core modules
-# This assumes test_agents.py is in AI-Econ-Lab/tests/core/
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-if PROJECT_ROOT not in sys.path:
-    sys.path.insert(0, PROJECT_ROOT)
+from core.models import AgentConfig, RuleBasedAgent, LLMAgent, AgentPool, MarketState, BidAsk, decide_actions_batch, run_round
+import numpy as np
+import random
 
-from core.models import AgentConfig, RuleBasedAgent, LLMAgent, MarketState, BidAsk
-from unittest.mock import MagicMock, patch
+@pytest.fixture(scope="module")
+def decide_rule_based():
+    """The numba kernel, imported on first use (as AgentPool does) so collecting these tests doesn't load numba."""
+    return importlib.import_module("core._kernels").decide_rule_based
 
 class TestRuleBasedAgent:
-    def test_buyer_creation(self):
-        config = AgentConfig(agent_id="buyer_test_1", agent_type="buyer", initial_funds=100, valuation_or_cost=120)
-        agent = RuleBasedAgent(config=config)
+    def test_buyer_creation(self, make_agent):
+        agent = make_agent(agent_id="buyer_test_1", agent_type="buyer", initial_funds=100, valuation_or_cost=120)
         assert agent.agent_id == "buyer_test_1"
         assert agent.agent_type == "buyer"
         assert agent.funds == 100
         assert agent.inventory == 0
         assert agent.valuation_or_cost == 120
 
-    def test_seller_creation(self):
-        config = AgentConfig(agent_id="seller_test_1", agent_type="seller", initial_inventory=10, valuation_or_cost=80)
-        agent = RuleBasedAgent(config=config)
+    def test_seller_creation(self, make_agent):
+        agent = make_agent(agent_id="seller_test_1", agent_type="seller", initial_inventory=10, valuation_or_cost=80)
         assert agent.agent_id == "seller_test_1"
         assert agent.agent_type == "seller"
         assert agent.funds == 0
         assert agent.inventory == 10
         assert agent.valuation_or_cost == 80
 
-    def test_buyer_decide_action_sufficient_funds(self):
-        config = AgentConfig(agent_id="b1", agent_type="buyer", initial_funds=200, valuation_or_cost=100)
-        agent = RuleBasedAgent(config=config)
+    def test_buyer_decide_action_sufficient_funds(self, make_agent):
+        agent = make_agent(agent_id="b1", agent_type="buyer", initial_funds=200, valuation_or_cost=100)
         market_state = MarketState(current_round=1)
         action = agent.decide_action(market_state)
         
@@ -42,17 +41,15 @@ class TestRuleBasedAgent:
         assert 0 < action.price <= 100 # Should bid at or below valuation
         assert action.quantity == 1 # Simple agent bids for 1 unit
 
-    def test_buyer_decide_action_insufficient_funds(self):
-        config = AgentConfig(agent_id="b2", agent_type="buyer", initial_funds=10, valuation_or_cost=100)
-        agent = RuleBasedAgent(config=config)
+    def test_buyer_decide_action_insufficient_funds(self, make_agent):
+        agent = make_agent(agent_id="b2", agent_type="buyer", initial_funds=10, valuation_or_cost=100)
         # Agent's logic might bid e.g. 80, but funds are only 10
         market_state = MarketState(current_round=1)
         action = agent.decide_action(market_state)
         assert action is None # Cannot afford its typical bid
 
-    def test_seller_decide_action_has_inventory(self):
-        config = AgentConfig(agent_id="s1", agent_type="seller", initial_inventory=5, valuation_or_cost=50)
-        agent = RuleBasedAgent(config=config)
+    def test_seller_decide_action_has_inventory(self, make_agent):
+        agent = make_agent(agent_id="s1", agent_type="seller", initial_inventory=5, valuation_or_cost=50)
         market_state = MarketState(current_round=1)
         action = agent.decide_action(market_state)
 
@@ -62,45 +59,119 @@ class TestRuleBasedAgent:
         assert action.price >= 50 # Should ask at or above cost
         assert action.quantity == 1
 
-    def test_seller_decide_action_no_inventory(self):
-        config = AgentConfig(agent_id="s2", agent_type="seller", initial_inventory=0, valuation_or_cost=50)
-        agent = RuleBasedAgent(config=config)
+    def test_seller_decide_action_no_inventory(self, make_agent):
+        agent = make_agent(agent_id="s2", agent_type="seller", initial_inventory=0, valuation_or_cost=50)
         market_state = MarketState(current_round=1)
         action = agent.decide_action(market_state)
         assert action is None
 
-    def test_update_state_after_transaction_buyer(self):
-        config = AgentConfig(agent_id="b_tx_test", agent_type="buyer", initial_funds=100, valuation_or_cost=80)
-        agent = RuleBasedAgent(config=config)
+    def test_update_state_after_transaction_buyer(self, make_agent):
+        agent = make_agent(agent_id="b_tx_test", agent_type="buyer", initial_funds=100, valuation_or_cost=80)
         agent.update_state_after_transaction(transaction_price=70, transaction_quantity=1, is_buyer=True)
         assert agent.funds == 30
         assert agent.inventory == 1
 
-    def test_update_state_after_transaction_seller(self):
-        config = AgentConfig(agent_id="s_tx_test", agent_type="seller", initial_inventory=5, valuation_or_cost=60)
-        agent = RuleBasedAgent(config=config)
+    def test_update_state_after_transaction_seller(self, make_agent):
+        agent = make_agent(agent_id="s_tx_test", agent_type="seller", initial_inventory=5, valuation_or_cost=60)
         agent.update_state_after_transaction(transaction_price=70, transaction_quantity=2, is_buyer=False)
         assert agent.funds == 140
         assert agent.inventory == 3
 
+    def test_agent_is_slotted(self, make_agent):
+        agent = make_agent(agent_id="buyer_slots", agent_type="buyer", initial_funds=100, valuation_or_cost=120)
+        assert not hasattr(agent, "__dict__")
+        # Compare against the same attributes held in an ordinary instance __dict__.
+        plain = type("PlainAgent", (), {})()
+        plain.__dict__.update(agent_id=agent.agent_id, agent_type=agent.agent_type, funds=agent.funds,
+                              inventory=agent.inventory, valuation_or_cost=agent.valuation_or_cost, _config=None)
+        assert sys.getsizeof(agent) < sys.getsizeof(plain) + sys.getsizeof(plain.__dict__)
+
+class TestAgentPool:
+    def test_decide_all_follows_rule_based_rules(self):
+        agents = [
+            RuleBasedAgent(config=AgentConfig(agent_id="b1", agent_type="buyer", initial_funds=200, valuation_or_cost=100)),
+            RuleBasedAgent(config=AgentConfig(agent_id="b2", agent_type="buyer", initial_funds=10, valuation_or_cost=100)),
+            RuleBasedAgent(config=AgentConfig(agent_id="s1", agent_type="seller", initial_inventory=5, valuation_or_cost=50)),
+            RuleBasedAgent(config=AgentConfig(agent_id="s2", agent_type="seller", initial_inventory=0, valuation_or_cost=50)),
+        ]
+        pool = AgentPool(agents)
+        actions = pool.decide_all(MarketState(current_round=3))
+
+        # b2 cannot afford its bid and s2 has nothing to sell
+        assert [action.agent_id for action in actions] == ["b1", "s1"]
+        bid, ask = actions
+        assert bid.bid_ask_type == "bid" and 80 <= bid.price <= 95
+        assert ask.bid_ask_type == "ask" and 52.5 <= ask.price <= 60
+        assert all(action.quantity == 1 and action.round == 3 for action in actions)
+
+    def test_decide_all_reads_current_agent_state(self):
+        agent = RuleBasedAgent(config=AgentConfig(agent_id="s1", agent_type="seller", initial_inventory=1, valuation_or_cost=50))
+        pool = AgentPool([agent])
+        assert len(pool.decide_all(MarketState(current_round=1))) == 1
+
+        agent.update_state_after_transaction(transaction_price=55, transaction_quantity=1, is_buyer=False)
+        assert pool.decide_all(MarketState(current_round=2)) == []
+        assert pool.inventory[0] == 0
+
+    def test_default_rng_follows_random_seed(self):
+        agents = [RuleBasedAgent(config=AgentConfig(agent_id=f"b{i}", agent_type="buyer", initial_funds=200, valuation_or_cost=100)) for i in range(5)]
+        prices = []
+        for _ in range(2):
+            random.seed(42)
+            prices.append([action.price for action in AgentPool(agents).decide_all(MarketState(current_round=1))])
+        assert prices[0] == prices[1]
+
+    @staticmethod
+    def _kernel_inputs(num_agents):
+        rng = np.random.default_rng(0)
+        is_buyer = rng.random(num_agents) < 0.5
+        funds = np.where(is_buyer, 1000.0, 0.0)
+        inventory = np.where(is_buyer, 0, 10)
+        valuation = rng.uniform(80, 120, num_agents)
+        rand_u = rng.random(num_agents)
+        return funds, inventory, valuation, is_buyer, rand_u
+
+    def test_decide_rule_based_kernel_prices_within_bands(self, decide_rule_based):
+        funds, inventory, valuation, is_buyer, rand_u = self._kernel_inputs(1_000)
+        prices = np.empty(len(funds))
+        valid = np.empty(len(funds), dtype=bool)
+        decide_rule_based(funds, inventory, valuation, is_buyer, rand_u,
+                          *AgentPool.BUYER_PRICE_FACTOR_RANGE, *AgentPool.SELLER_PRICE_FACTOR_RANGE, prices, valid)
+
+        assert valid.all() # Every agent has funds or inventory here
+        factors = prices / valuation
+        # Prices are rounded to cents, hence the small tolerance on the band edges
+        assert ((factors[is_buyer] >= 0.80 - 1e-3) & (factors[is_buyer] <= 0.95 + 1e-3)).all()
+        assert ((factors[~is_buyer] >= 1.05 - 1e-3) & (factors[~is_buyer] <= 1.20 + 1e-3)).all()
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize("num_agents", [10_000])
+    def test_decide_rule_based_kernel_faster_than_python_loop(self, decide_rule_based, num_agents):
+        funds, inventory, valuation, is_buyer, rand_u = self._kernel_inputs(num_agents)
+        prices = np.empty(num_agents)
+        valid = np.empty(num_agents, dtype=bool)
+        bands = (*AgentPool.BUYER_PRICE_FACTOR_RANGE, *AgentPool.SELLER_PRICE_FACTOR_RANGE)
+
+        decide_rule_based(funds, inventory, valuation, is_buyer, rand_u, *bands, prices, valid) # JIT warm-up
+        start = time.perf_counter()
+        decide_rule_based(funds, inventory, valuation, is_buyer, rand_u, *bands, prices, valid)
+        kernel_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(num_agents):
+            if is_buyer[i]:
+                price = round(random.uniform(0.80, 0.95) * valuation[i], 2)
+                _ = price > 0 and funds[i] >= price
+            else:
+                price = round(random.uniform(1.05, 1.20) * valuation[i], 2)
+                _ = price > 0 and inventory[i] > 0
+        python_time = time.perf_counter() - start
+
+        assert kernel_time < python_time
+
 # To run these tests, navigate to the AI-Econ-Lab directory and run:
 # pytest tests/core/test_agents.py
 class TestLLMAgent:
-    @pytest.fixture
-    def mock_llm_client(self):
-        return MagicMock()
-
-    @pytest.fixture
-    def mock_prompt_manager(self):
-        mock = MagicMock()
-        # Default prompt structure, can be overridden in tests
-        mock.get_prompt.return_value = {
-            "persona": "You are an agent.",
-            "instructions": "Instructions: {current_round} {agent_funds} {agent_inventory} {valuation} {cost} {recent_transactions_summary} {market_bids_summary} {market_asks_summary}",
-            "output_format_notes": "Format: JSON"
-        }
-        return mock
-
     @pytest.fixture
     def buyer_config(self):
         return AgentConfig(
@@ -121,46 +192,48 @@ class TestLLMAgent:
             valuation_or_cost=50.0
         )
 
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def market_state(self):
+        # MarketState is frozen, so one instance can be shared by every test.
         return MarketState(current_round=1)
 
-    def test_llm_agent_creation_buyer(self, buyer_config, mock_llm_client, mock_prompt_manager):
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_llm_agent_creation_buyer(self, buyer_config, stub_llm, stub_prompt_manager):
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         assert agent.agent_id == "llm_buyer_1"
         assert agent.agent_type == "buyer"
         assert agent.funds == 200.0
         assert agent.inventory == 0
         assert agent.llm_persona_prompt_key == "buyer_default"
-        assert agent.llm_client == mock_llm_client
-        assert agent.prompt_manager == mock_prompt_manager
+        assert agent.llm_client == stub_llm
+        assert agent.prompt_manager == stub_prompt_manager
 
-    def test_llm_agent_creation_seller(self, seller_config, mock_llm_client, mock_prompt_manager):
-        agent = LLMAgent(config=seller_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_llm_agent_creation_seller(self, seller_config, stub_llm, stub_prompt_manager):
+        agent = LLMAgent(config=seller_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         assert agent.agent_id == "llm_seller_1"
         assert agent.agent_type == "seller"
         assert agent.funds == 0
         assert agent.inventory == 10
         assert agent.llm_persona_prompt_key == "seller_default"
 
-    def test_decide_action_valid_bid(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 110.0, "quantity": 2}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_valid_bid(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        # 95 x 2 = 190 stays within the fixture's 200 funds
+        stub_llm.response = '{"action": "BID", "price": 95.0, "quantity": 2}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         
         action = agent.decide_action(market_state)
 
         assert isinstance(action, BidAsk)
         assert action.agent_id == "llm_buyer_1"
         assert action.bid_ask_type == "bid"
-        assert action.price == 110.0
+        assert action.price == 95.0
         assert action.quantity == 2
         assert action.round == 1
-        mock_prompt_manager.get_prompt.assert_called_once_with("buyer_default", agent_type="buyer")
-        mock_llm_client.generate_text.assert_called_once()
+        assert stub_prompt_manager.calls == ["buyer_default"]
+        assert stub_llm.calls == 1
 
-    def test_decide_action_valid_ask(self, seller_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.return_value = '{"action": "ASK", "price": 60.0, "quantity": 3}'
-        agent = LLMAgent(config=seller_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_valid_ask(self, seller_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "ASK", "price": 60.0, "quantity": 3}'
+        agent = LLMAgent(config=seller_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
 
         action = agent.decide_action(market_state)
 
@@ -170,203 +243,180 @@ class TestLLMAgent:
         assert action.price == 60.0
         assert action.quantity == 3
         assert action.round == 1
-        mock_prompt_manager.get_prompt.assert_called_once_with("seller_default", agent_type="seller")
-        mock_llm_client.generate_text.assert_called_once()
+        assert stub_prompt_manager.calls == ["seller_default"]
+        assert stub_llm.calls == 1
 
-    def test_decide_action_valid_pass(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.return_value = '{"action": "PASS", "price": null, "quantity": null}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_valid_pass(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "PASS", "price": null, "quantity": null}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
 
         action = agent.decide_action(market_state)
 
         assert action is None
-        mock_prompt_manager.get_prompt.assert_called_once_with("buyer_default", agent_type="buyer")
-        mock_llm_client.generate_text.assert_called_once()
+        assert stub_prompt_manager.calls == ["buyer_default"]
+        assert stub_llm.calls == 1
 
-    def test_decide_action_invalid_json_response(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 100.0, "quantity": 1' # Malformed JSON
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_invalid_json_response(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "BID", "price": 100.0, "quantity": 1' # Malformed JSON
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
 
         action = agent.decide_action(market_state)
         assert action is None
         # Optionally, check logs if logging is captured: caplog.records should contain error
 
-    def test_decide_action_json_missing_action_key(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.return_value = '{"price": 100.0, "quantity": 1}' # Missing "action"
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_json_missing_action_key(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"price": 100.0, "quantity": 1}' # Missing "action"
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         
         action = agent.decide_action(market_state)
         assert action is None
 
-    def test_decide_action_json_missing_price_key_for_bid(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "quantity": 1}' # Missing "price"
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_json_missing_price_key_for_bid(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "BID", "quantity": 1}' # Missing "price"
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
 
         action = agent.decide_action(market_state)
         assert action is None
 
-    def test_decide_action_json_missing_quantity_key_for_ask(self, seller_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.return_value = '{"action": "ASK", "price": 70.0}' # Missing "quantity"
-        agent = LLMAgent(config=seller_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_json_missing_quantity_key_for_ask(self, seller_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "ASK", "price": 70.0}' # Missing "quantity"
+        agent = LLMAgent(config=seller_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
 
         action = agent.decide_action(market_state)
         assert action is None
 
-    def test_decide_action_llm_client_error(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_llm_client.generate_text.side_effect = Exception("LLM API error")
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
-
-        # The LLMAgent's decide_action catches generic exceptions from llm_client.generate_text
-        # and should return None without raising the exception further.
-        # However, the current implementation of LLMAgent.decide_action does not explicitly catch
-        # exceptions from llm_client.generate_text. It will propagate.
-        # For this test to pass as written (expecting None), LLMAgent needs to catch it.
-        # If LLMAgent is *not* supposed to catch it, this test should use pytest.raises.
-        # Based on current LLMAgent code, it does NOT catch this.
-        # Let's assume the requirement implies it *should* return None.
-        # The LLMAgent code has been updated to catch this.
-        
-        # Re-checking core/models.py LLMAgent.decide_action
-        # Line 264: llm_response_text = self.llm_client.generate_text(prompt=formatted_prompt)
-        # This call is NOT within a try-except block that would catch a generic Exception from generate_text
-        # and return None. It will propagate.
-        # The test needs to reflect this, or the code needs to change.
-        # The user's instruction "Assert decide_action returns None" implies the code should handle it.
-        # For now, I will write the test assuming the code *will be* or *is intended to be* robust.
-        # If the test fails, it indicates LLMAgent needs a try-except around the generate_text call.
-        # UPDATE: The LLMAgent code in `core/models.py` does NOT catch exceptions from `llm_client.generate_text()`
-        # and return None. It will propagate.
-        # The prompt says "Assert decide_action returns None". This is a contradiction.
-        # I will assume the intent is that the agent *should* gracefully handle this and return None.
-        # The provided `core/models.py` does not do this.
-        # I will write the test as requested, and it will fail if `core/models.py` is not updated.
-        # For the purpose of this exercise, I will assume the `LLMAgent` is meant to be robust.
-        # The current `LLMAgent` in `core/models.py` does *not* catch this.
-        # The test will be written to expect `None` as per instructions.
-        # If `llm_client.generate_text` raises an error, and `decide_action` doesn't catch it,
-        # the test will fail with an unhandled exception.
-        # The instructions state: "Assert decide_action returns None".
-        # This implies `decide_action` should catch the exception.
-        # The provided `core/models.py` (lines 264-268) does not show a try-except around `generate_text`.
-        # It only checks if `llm_response_text` is falsy *after* the call.
-        # I will proceed with the test expecting `None`.
+    def test_decide_action_llm_client_error(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.side_effect = Exception("LLM API error")
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
 
+        # decide_action wraps only the generate_text call; a failing client yields no action.
         action = agent.decide_action(market_state)
         assert action is None
 
 
-    def test_decide_action_insufficient_funds_for_bid(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
+    def test_decide_action_insufficient_funds_for_bid(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
         # Agent has 200 funds
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 100.0, "quantity": 3}' # Cost 300
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 100.0, "quantity": 3}' # Cost 300
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         
         action = agent.decide_action(market_state)
         assert action is None
 
-    def test_decide_action_insufficient_inventory_for_ask(self, seller_config, mock_llm_client, mock_prompt_manager, market_state):
+    def test_decide_action_insufficient_inventory_for_ask(self, seller_config, stub_llm, stub_prompt_manager, market_state):
         # Agent has 10 inventory
-        mock_llm_client.generate_text.return_value = '{"action": "ASK", "price": 50.0, "quantity": 15}' # Needs 15
-        agent = LLMAgent(config=seller_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "ASK", "price": 50.0, "quantity": 15}' # Needs 15
+        agent = LLMAgent(config=seller_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
 
         action = agent.decide_action(market_state)
         assert action is None
 
-    def test_decide_action_prompt_manager_returns_none(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
-        mock_prompt_manager.get_prompt.return_value = None
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+    def test_decide_action_prompt_manager_returns_none(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_prompt_manager.prompt = None
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
-        mock_llm_client.generate_text.assert_not_called()
+        assert stub_llm.calls == 0
 
-    def test_decide_action_prompt_formatting_key_error(self, buyer_config, mock_llm_client, mock_prompt_manager, market_state):
+    def test_decide_action_prompt_formatting_key_error(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
         # Prompt expects 'valuation' but AgentConfig might not always have it for LLMAgent if not set
         # The fixture buyer_config *does* set valuation_or_cost.
         # Let's make a prompt that expects a non-existent key.
-        mock_prompt_manager.get_prompt.return_value = {"instructions": "Hello {non_existent_key}"}
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_prompt_manager.prompt = {"instructions": "Hello {non_existent_key}"}
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         
         action = agent.decide_action(market_state)
         assert action is None
-        mock_llm_client.generate_text.assert_not_called() # Should fail before calling LLM
+        assert stub_llm.calls == 0 # Should fail before calling LLM
+
+    def test_decide_action_prompt_format_spec_on_none_field(self, stub_llm, stub_prompt_manager, market_state):
+        # A buyer without a valuation renders it as None, which a numeric format spec rejects.
+        config = AgentConfig(agent_id="llm_buyer_2", agent_type="buyer", initial_funds=200.0,
+                             llm_persona_prompt_key="buyer_default")
+        stub_prompt_manager.prompt = {"instructions": "Value: {valuation:.2f}"}
+        agent = LLMAgent(config=config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
+
+        action = agent.decide_action(market_state)
+        assert action is None
+        assert stub_llm.calls == 0
 
     def test_decide_action_llm_returns_action_inconsistent_with_agent_type_buyer_tries_ask(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "ASK", "price": 100.0, "quantity": 1}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "ASK", "price": 100.0, "quantity": 1}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_llm_returns_action_inconsistent_with_agent_type_seller_tries_bid(
-        self, seller_config, mock_llm_client, mock_prompt_manager, market_state
+        self, seller_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 60.0, "quantity": 1}'
-        agent = LLMAgent(config=seller_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 60.0, "quantity": 1}'
+        agent = LLMAgent(config=seller_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_llm_returns_non_positive_price(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": -10.0, "quantity": 1}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": -10.0, "quantity": 1}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_llm_returns_zero_price(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 0, "quantity": 1}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 0, "quantity": 1}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_llm_returns_non_positive_quantity(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 10.0, "quantity": -1}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 10.0, "quantity": -1}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
     
     def test_decide_action_llm_returns_zero_quantity(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 10.0, "quantity": 0}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 10.0, "quantity": 0}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_price_as_non_numeric_string(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": "ten", "quantity": 1}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": "ten", "quantity": 1}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_quantity_as_non_integer_string(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 10, "quantity": "one"}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 10, "quantity": "one"}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_quantity_as_non_integer_convertible_string(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 10, "quantity": "1.5"}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 10, "quantity": "1.5"}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert action is None
 
     def test_decide_action_quantity_as_valid_float_integer(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
         # Buyer has 200 funds, valuation 150. Bid is for 10, quantity 2. Cost = 20. Valid.
-        mock_llm_client.generate_text.return_value = '{"action": "BID", "price": 10, "quantity": 2.0}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "BID", "price": 10, "quantity": 2.0}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
         assert isinstance(action, BidAsk)
         assert action.agent_id == "llm_buyer_1"
@@ -374,10 +424,127 @@ class TestLLMAgent:
         assert action.price == 10
         assert action.quantity == 2 # Should be converted to int
 
+    @pytest.mark.parametrize("action_text", ["bid", "Bid"])
+    def test_decide_action_action_is_case_insensitive(
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state, action_text
+    ):
+        stub_llm.response = f'{{"action": "{action_text}", "price": 10, "quantity": 1}}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
+        action = agent.decide_action(market_state)
+        assert isinstance(action, BidAsk)
+        assert action.bid_ask_type == "bid"
+
     def test_decide_action_unrecognized_action_string(
-        self, buyer_config, mock_llm_client, mock_prompt_manager, market_state
+        self, buyer_config, stub_llm, stub_prompt_manager, market_state
     ):
-        mock_llm_client.generate_text.return_value = '{"action": "HOLD", "price": 10, "quantity": 1}'
-        agent = LLMAgent(config=buyer_config, llm_client=mock_llm_client, prompt_manager=mock_prompt_manager)
+        stub_llm.response = '{"action": "HOLD", "price": 10, "quantity": 1}'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
         action = agent.decide_action(market_state)
-        assert action is None
\ No newline at end of file
+        assert action is None
+
+    def test_decide_actions_batch_single_llm_call(self, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "BID", "price": 10.0, "quantity": 1}'
+        agents = [
+            LLMAgent(
+                config=AgentConfig(
+                    agent_id=f"llm_buyer_{i}",
+                    agent_type="buyer",
+                    initial_funds=200.0,
+                    llm_persona_prompt_key="buyer_default",
+                    valuation_or_cost=150.0
+                ),
+                llm_client=stub_llm,
+                prompt_manager=stub_prompt_manager
+            )
+            for i in range(10)
+        ]
+
+        actions = decide_actions_batch(agents, market_state, stub_llm)
+
+        assert len(stub_llm.batches) == 1
+        assert len(stub_llm.batches[0]) == 10
+        assert stub_llm.calls == 0
+        assert [action.agent_id for action in actions] == [agent.agent_id for agent in agents]
+        assert all(action.bid_ask_type == "bid" and action.price == 10.0 for action in actions)
+
+    def test_run_round_llm_calls_are_concurrent(self, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "BID", "price": 10.0, "quantity": 1}'
+        stub_llm.delay = 0.01
+        agents = [
+            LLMAgent(
+                config=AgentConfig(
+                    agent_id=f"llm_buyer_{i}",
+                    agent_type="buyer",
+                    initial_funds=200.0,
+                    llm_persona_prompt_key="buyer_default",
+                    valuation_or_cost=150.0
+                ),
+                llm_client=stub_llm,
+                prompt_manager=stub_prompt_manager
+            )
+            for i in range(10)
+        ]
+
+        actions = run_round(agents, market_state)
+
+        assert stub_llm.async_calls == 10
+        assert stub_llm.peak_in_flight == 10 # Sequential calls would never overlap
+        assert all(isinstance(action, BidAsk) for action in actions)
+
+    def test_decide_action_timeout_uses_fallback(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = '{"action": "BID", "price": 10.0, "quantity": 1}'
+        stub_llm.delay = 0.2
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager,
+                         latency_budget_ms=20)
+
+        random.seed(7)
+        action = asyncio.run(agent.decide_action_async(market_state))
+        random.seed(7)
+        expected = RuleBasedAgent(config=buyer_config).decide_action(market_state)
+
+        assert isinstance(action, BidAsk)
+        assert action == expected
+
+    def test_decide_action_async_client_error_returns_none(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        # Only a late LLM falls back; a failing one is reported like in decide_action
+        stub_llm.side_effect = RuntimeError("LLM API unavailable")
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
+
+        action = asyncio.run(agent.decide_action_async(market_state))
+        assert action is None
+        assert stub_llm.async_calls == 1
+
+    def test_decide_action_async_invalid_json_returns_none(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        stub_llm.response = 'This is not JSON'
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
+
+        action = asyncio.run(agent.decide_action_async(market_state))
+        assert action is None
+        assert stub_llm.async_calls == 1
+
+    def test_build_prompt_compiled_renderer_matches_format_map(self, buyer_config, stub_llm, stub_prompt_manager, market_state):
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
+        fields = {
+            "current_round": 1, "agent_funds": 200.0, "agent_inventory": 0, "valuation": 150.0, "cost": "N/A",
+            "recent_transactions_summary": "None", "market_bids_summary": "None", "market_asks_summary": "None",
+        }
+        assert agent._render is not None
+        assert agent.build_prompt(market_state) == agent._template.format_map(fields)
+
+    @pytest.mark.benchmark
+    def test_build_prompt_compiled_renderer_faster_than_format_map(self, buyer_config, stub_llm, stub_prompt_manager):
+        agent = LLMAgent(config=buyer_config, llm_client=stub_llm, prompt_manager=stub_prompt_manager)
+        fields = {
+            "current_round": 1, "agent_funds": 200.0, "agent_inventory": 0, "valuation": 150.0, "cost": "N/A",
+            "recent_transactions_summary": "None", "market_bids_summary": "None", "market_asks_summary": "None",
+        }
+        dynamic = {key: value for key, value in fields.items() if key not in ("valuation", "cost")}
+        start = time.perf_counter()
+        for _ in range(2000):
+            agent._render(**dynamic)
+        render_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(2000):
+            agent._template.format_map(fields)
+        format_map_time = time.perf_counter() - start
+        assert render_time < format_map_time
@@ -1,96 +1,120 @@
 import pytest
-import yaml
-import os
-from unittest.mock import patch
-from core.prompt_manager import get_prompt, PROMPT_CONFIG_BASE_DIR
+from pathlib import Path
+from core.prompt_manager import get_prompt, render_static, clear_static_cache, PROMPT_CONFIG_BASE_DIR
 
-class TestPromptManager:
-
-    @pytest.fixture(autouse=True)
-    def mock_getcwd(self, tmp_path, monkeypatch):
-        """Fixture to mock os.getcwd() to return tmp_path for all tests in this class."""
-        monkeypatch.setattr('core.prompt_manager.os.getcwd', lambda: str(tmp_path))
+# Prompt files as precomputed YAML bytes, keyed by path under PROMPT_CONFIG_BASE_DIR.
+_VALID_PROMPT_YAML = (
+    b"name: Test Valid Prompt\n"
+    b"description: A test prompt from module.\n"
+    b"instructions: These are test instructions.\n"
+)
+_VALID_PROMPT_EXT_YAML = b"name: Test Valid Prompt Ext\n"
+_DIRECT_PROMPT_YAML = b"name: Test Direct Prompt\ndescription: A test prompt from base config.\n"
+_MALFORMED_PROMPT_YAML = b"name: Test Malformed\ndescription: Bad YAML format because of this tab:\t- item"
 
-    def test_load_valid_prompt_from_module(self, tmp_path):
-        module_name = "test_module"
-        prompt_key = "valid_prompt"
-        prompts_module_dir = tmp_path / PROMPT_CONFIG_BASE_DIR / module_name
-        prompts_module_dir.mkdir(parents=True, exist_ok=True)
-        
-        valid_prompt_file = prompts_module_dir / f"{prompt_key}.yaml"
-        valid_prompt_content = {
-            "name": "Test Valid Prompt",
-            "description": "A test prompt from module.",
-            "instructions": "These are test instructions.",
-        }
-        with open(valid_prompt_file, 'w') as f:
-            yaml.dump(valid_prompt_content, f)
+PROMPT_FILES = {
+    "test_module/valid_prompt.yaml": _VALID_PROMPT_YAML,
+    "test_module/valid_prompt_ext.yaml": _VALID_PROMPT_EXT_YAML,
+    # Only in the base directory, to exercise get_prompt's fallback lookup
+    "direct_prompt.yaml": _DIRECT_PROMPT_YAML,
+    "test_malformed_module/malformed_prompt.yaml": _MALFORMED_PROMPT_YAML,
+}
 
-        prompt_data = get_prompt(prompt_key, module=module_name)
-        assert prompt_data is not None
-        assert prompt_data["name"] == "Test Valid Prompt"
-        assert prompt_data["description"] == "A test prompt from module."
+# What yaml.safe_load returns for each valid prompt file, keyed by file name.
+PARSED_PROMPTS = {
+    "valid_prompt.yaml": {
+        "name": "Test Valid Prompt",
+        "description": "A test prompt from module.",
+        "instructions": "These are test instructions.",
+    },
+    "valid_prompt_ext.yaml": {"name": "Test Valid Prompt Ext"},
+    "direct_prompt.yaml": {"name": "Test Direct Prompt", "description": "A test prompt from base config."},
+}
 
-    def test_load_valid_prompt_from_module_with_extension(self, tmp_path):
-        module_name = "test_module_ext"
-        prompt_key_with_ext = "valid_prompt_ext.yaml"
-        prompts_module_dir = tmp_path / PROMPT_CONFIG_BASE_DIR / module_name
-        prompts_module_dir.mkdir(parents=True, exist_ok=True)
-        
-        valid_prompt_file = prompts_module_dir / prompt_key_with_ext
-        valid_prompt_content = {"name": "Test Valid Prompt Ext"}
-        with open(valid_prompt_file, 'w') as f:
-            yaml.dump(valid_prompt_content, f)
+@pytest.fixture
+def parsed_yaml(monkeypatch):
+    """
+    Replaces yaml.safe_load with a lookup into PARSED_PROMPTS, so happy-path tests skip the
+    PyYAML loader. The files still have to exist for get_prompt to open them. The malformed
+    YAML test doesn't use this and goes through the real loader.
+    """
+    monkeypatch.setattr('core.prompt_manager.yaml.safe_load', lambda stream: PARSED_PROMPTS[Path(stream.name).name])
 
-        prompt_data = get_prompt(prompt_key_with_ext, module=module_name)
-        assert prompt_data is not None
-        assert prompt_data["name"] == "Test Valid Prompt Ext"
+@pytest.fixture(scope="session")
+def prompts_root(tmp_path_factory):
+    """
+    Builds a project root holding every prompt file variant the tests look up, once per
+    session. The tests only read from it, so they all share the same tree.
+    """
+    root = tmp_path_factory.mktemp("prompts_root")
+    prompts_dir = root / PROMPT_CONFIG_BASE_DIR
+    for relative_path, payload in PROMPT_FILES.items():
+        file_path = prompts_dir / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(payload)
+    return root
 
-    def test_load_valid_prompt_from_base_config_fallback(self, tmp_path):
-        # This test relies on the fallback mechanism in get_prompt
-        prompt_key = "direct_prompt"
-        prompts_base_dir = tmp_path / PROMPT_CONFIG_BASE_DIR
-        prompts_base_dir.mkdir(parents=True, exist_ok=True) # Ensure base prompt dir exists
+@pytest.fixture(scope="class")
+def project_root(prompts_root):
+    """
+    Makes prompts_root the prompt manager's project root for the requesting class. The patch
+    ends with the class, so module-level tests still see the real prompts.
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr('core.prompt_manager.PROJECT_ROOT', prompts_root)
+        yield prompts_root
 
-        # Create a module dir to make the first lookup fail
-        module_name = "non_existent_module_for_fallback"
-        # (tmp_path / PROMPT_CONFIG_BASE_DIR / module_name).mkdir(parents=True, exist_ok=True)
+@pytest.mark.usefixtures("project_root")
+class TestPromptManager:
 
+    @pytest.mark.usefixtures("parsed_yaml")
+    @pytest.mark.parametrize("prompt_key, expected", [
+        ("valid_prompt", {"name": "Test Valid Prompt", "description": "A test prompt from module."}),
+        ("valid_prompt_ext.yaml", {"name": "Test Valid Prompt Ext"}), # Key already carries the extension
+    ])
+    def test_load_valid_prompt_from_module(self, prompt_key, expected):
+        prompt_data = get_prompt(prompt_key, module_name="test_module")
+        assert prompt_data is not None
+        assert prompt_data.items() >= expected.items()
 
-        valid_prompt_file = prompts_base_dir / f"{prompt_key}.yaml"
-        valid_prompt_content = {
-            "name": "Test Direct Prompt",
-            "description": "A test prompt from base config.",
-        }
-        with open(valid_prompt_file, 'w') as f:
-            yaml.dump(valid_prompt_content, f)
-        
-        # Call get_prompt with a module that won't contain the file, to trigger fallback
-        prompt_data = get_prompt(prompt_key, module=module_name)
+    @pytest.mark.usefixtures("parsed_yaml")
+    def test_load_valid_prompt_from_base_config_fallback(self):
+        # This test relies on the fallback mechanism in get_prompt:
+        # the module doesn't contain the file, so the base directory is searched.
+        prompt_data = get_prompt("direct_prompt", module_name="non_existent_module_for_fallback")
         assert prompt_data is not None
         assert prompt_data["name"] == "Test Direct Prompt"
         assert prompt_data["description"] == "A test prompt from base config."
 
-    def test_get_prompt_file_not_found(self, tmp_path):
+    def test_get_prompt_file_not_found(self):
         # Ensure no file exists for this key
-        prompt_data = get_prompt("non_existent_prompt", module="test_module_not_found")
+        prompt_data = get_prompt("non_existent_prompt", module_name="test_module_not_found")
         assert prompt_data is None
 
-    def test_get_prompt_malformed_yaml(self, tmp_path):
-        module_name = "test_malformed_module"
-        prompt_key = "malformed_prompt"
-        prompts_module_dir = tmp_path / PROMPT_CONFIG_BASE_DIR / module_name
-        prompts_module_dir.mkdir(parents=True, exist_ok=True)
-        
-        malformed_prompt_file = prompts_module_dir / f"{prompt_key}.yaml"
-        with open(malformed_prompt_file, 'w') as f:
-            f.write("name: Test Malformed\ndescription: Bad YAML format because of this tab:\t- item")
-
-        prompt_data = get_prompt(prompt_key, module=module_name)
+    def test_get_prompt_malformed_yaml(self):
+        prompt_data = get_prompt("malformed_prompt", module_name="test_malformed_module")
         assert prompt_data is None
 
-    def test_get_prompt_non_existent_module_dir(self, tmp_path):
+    def test_get_prompt_non_existent_module_dir(self):
         # Attempt to load a prompt from a module directory that doesn't exist
         # This should also result in the prompt not being found and returning None
-        prompt_data = get_prompt("some_prompt_in_ghost_module", module="ghost_module")
-        assert prompt_data is None
\ No newline at end of file
+        prompt_data = get_prompt("some_prompt_in_ghost_module", module_name="ghost_module")
+        assert prompt_data is None
+
+def test_render_static_assembles_and_caches_template():
+    clear_static_cache()
+    template = render_static("buyer_default")
+    assert "{current_round}" in template
+    assert "{{" in template # Literal braces stay escaped for str.format
+    assert render_static("buyer_default") is template
+
+def test_render_static_retries_prompts_that_failed_to_load(tmp_path, monkeypatch):
+    clear_static_cache()
+    monkeypatch.setattr('core.prompt_manager.PROJECT_ROOT', tmp_path)
+    assert render_static("late_prompt", module_name="test_module") is None
+
+    prompt_file = tmp_path / PROMPT_CONFIG_BASE_DIR / "test_module" / "late_prompt.yaml"
+    prompt_file.parent.mkdir(parents=True)
+    prompt_file.write_bytes(b"instructions: Round {current_round}\n")
+    assert render_static("late_prompt", module_name="test_module") == "Round {current_round}"
+    clear_static_cache()
@@ -1,136 +1,77 @@
 import pytest
-import sys
-import os
+import copy
+import numpy as np
 
-# Add project root to sys.path
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-if PROJECT_ROOT not in sys.path:
-    sys.path.insert(0, PROJECT_ROOT)
-
-from core.models import BidAsk, AgentConfig, RuleBasedAgent
+from core.models import AgentConfig, BidAsk, LLMAgent, MarketState
 from core.simulation_engine import MarketSimulation
 
-class TestMarketSimulationMatching:
+# Order prototypes built without validation; tests derive their orders with
+# model_copy, which also skips Pydantic validation.
+_BID_TEMPLATE = BidAsk.model_construct(agent_id="", bid_ask_type="bid", price=0, quantity=0, round=1)
+_ASK_TEMPLATE = BidAsk.model_construct(agent_id="", bid_ask_type="ask", price=0, quantity=0, round=1)
 
-    def test_no_match_bid_lower_than_ask(self):
-        sim = MarketSimulation(agents=[], num_rounds=1) # Agents not needed for direct matching test
-        bids = [BidAsk(agent_id="b1", bid_ask_type="bid", price=90, quantity=1, round=1)]
-        asks = [BidAsk(agent_id="s1", bid_ask_type="ask", price=100, quantity=1, round=1)]
-        transactions = sim._match_orders_simple_CDA(bids, asks)
-        assert len(transactions) == 0
-
-    def test_simple_match_one_buyer_one_seller(self):
-        sim = MarketSimulation(agents=[], num_rounds=1)
-        sim.market_state.current_round = 1 # Set current round for transaction
-        bids = [BidAsk(agent_id="b1", bid_ask_type="bid", price=100, quantity=1, round=1)]
-        asks = [BidAsk(agent_id="s1", bid_ask_type="ask", price=90, quantity=1, round=1)]
-        transactions = sim._match_orders_simple_CDA(bids, asks)
-        
-        assert len(transactions) == 1
-        tx = transactions[0]
-        assert tx.buyer_id == "b1"
-        assert tx.seller_id == "s1"
-        assert tx.quantity == 1
-        assert tx.price == 95.00 # Midpoint of 100 and 90
-
-    def test_match_partial_fill_buyer_wants_more(self):
-        sim = MarketSimulation(agents=[], num_rounds=1)
-        sim.market_state.current_round = 1
-        bids = [BidAsk(agent_id="b1", bid_ask_type="bid", price=100, quantity=5, round=1)]
-        asks = [BidAsk(agent_id="s1", bid_ask_type="ask", price=90, quantity=2, round=1)]
-        transactions = sim._match_orders_simple_CDA(bids, asks)
-        
-        assert len(transactions) == 1
-        tx = transactions[0]
-        assert tx.quantity == 2 # Limited by seller's quantity
-        assert tx.price == 95.00
-        # Original bid/ask objects are modified by _match_orders_simple_CDA
-        assert bids[0].quantity == 3 # Remaining quantity for buyer
-        assert asks[0].quantity == 0 # Seller fully matched
-
-    def test_match_partial_fill_seller_wants_more(self):
-        sim = MarketSimulation(agents=[], num_rounds=1)
-        sim.market_state.current_round = 1
-        bids = [BidAsk(agent_id="b1", bid_ask_type="bid", price=100, quantity=2, round=1)]
-        asks = [BidAsk(agent_id="s1", bid_ask_type="ask", price=90, quantity=5, round=1)]
-        transactions = sim._match_orders_simple_CDA(bids, asks)
-        
-        assert len(transactions) == 1
-        tx = transactions[0]
-        assert tx.quantity == 2 # Limited by buyer's quantity
-        assert tx.price == 95.00
-        assert bids[0].quantity == 0
-        assert asks[0].quantity == 3
-
-    def test_multiple_matches(self):
-        sim = MarketSimulation(agents=[], num_rounds=1)
-        sim.market_state.current_round = 1
-        bids = [
-            BidAsk(agent_id="b1", bid_ask_type="bid", price=105, quantity=2, round=1), # Best bid
-            BidAsk(agent_id="b2", bid_ask_type="bid", price=100, quantity=3, round=1)
-        ]
-        asks = [
-            BidAsk(agent_id="s1", bid_ask_type="ask", price=90, quantity=1, round=1),  # Best ask
-            BidAsk(agent_id="s2", bid_ask_type="ask", price=95, quantity=4, round=1)
-        ]
-        transactions = sim._match_orders_simple_CDA(bids, asks)
-        
-        assert len(transactions) == 2 # b1-s1, then b1-s2 (or b2-s2 depending on remaining qty)
-        
-        total_quantity_traded = sum(tx.quantity for tx in transactions)
-        assert total_quantity_traded > 0
-        
-        # Detailed checks for multiple matches can be complex due to order of matching.
-        # For this simple CDA:
-        # 1. b1 (105) vs s1 (90). Qty 1 at (105+90)/2 = 97.5. b1 has 1 left. s1 done.
-        # 2. b1 (105, 1 left) vs s2 (95). Qty 1 at (105+95)/2 = 100. b1 done. s2 has 3 left.
-        # 3. b2 (100, 3 left) vs s2 (95, 3 left). Qty 3 at (100+95)/2 = 97.5. b2 done. s2 done.
-        # So, 3 transactions expected.
-        
-        # Let's re-verify the logic of _match_orders_simple_CDA:
-        # It iterates while bid_idx < len(bids) and ask_idx < len(asks)
-        # If match, it reduces quantities and increments idx if qty becomes 0.
-
-        # Sorted bids: (b1, 105, 2), (b2, 100, 3)
-        # Sorted asks: (s1, 90, 1), (s2, 95, 4)
-
-        # Match 1: b1 vs s1. Price (105+90)/2 = 97.5. Qty 1.
-        #   b1: qty becomes 1. s1: qty becomes 0 (s1_idx++)
-        #   tx1: b1, s1, 97.5, 1
-        # Remaining bids: (b1, 105, 1), (b2, 100, 3)
-        # Remaining asks: (s2, 95, 4)
-
-        # Match 2: b1 vs s2. Price (105+95)/2 = 100. Qty 1.
-        #   b1: qty becomes 0 (b1_idx++). s2: qty becomes 3.
-        #   tx2: b1, s2, 100, 1
-        # Remaining bids: (b2, 100, 3)
-        # Remaining asks: (s2, 95, 3)
-
-        # Match 3: b2 vs s2. Price (100+95)/2 = 97.5. Qty 3.
-        #   b2: qty becomes 0 (b2_idx++). s2: qty becomes 0 (s2_idx++).
-        #   tx3: b2, s2, 97.5, 3
-        
-        assert len(transactions) == 3
-        assert transactions[0].buyer_id == "b1" and transactions[0].seller_id == "s1" and transactions[0].quantity == 1
-        assert transactions[1].buyer_id == "b1" and transactions[1].seller_id == "s2" and transactions[1].quantity == 1
-        assert transactions[2].buyer_id == "b2" and transactions[2].seller_id == "s2" and transactions[2].quantity == 3
+def _bid(agent_id, price, quantity):
+    return _BID_TEMPLATE.model_copy(update={"agent_id": agent_id, "price": price, "quantity": quantity})
+
+def _ask(agent_id, price, quantity):
+    return _ASK_TEMPLATE.model_copy(update={"agent_id": agent_id, "price": price, "quantity": quantity})
+
+# (buyer_id, seller_id, price, quantity) records for comparing matched transactions in one go
+_MATCH_DTYPE = [("b", "U2"), ("s", "U2"), ("p", "f8"), ("q", "i4")]
 
+@pytest.fixture(scope="module")
+def empty_sim():
+    # Agents not needed for direct matching tests
+    return MarketSimulation(agents=[], num_rounds=1)
 
-    def test_update_agent_states_after_transaction(self):
-        buyer_config = AgentConfig(agent_id="buyer_update", agent_type="buyer", initial_funds=1000, valuation_or_cost=100)
-        seller_config = AgentConfig(agent_id="seller_update", agent_type="seller", initial_inventory=10, valuation_or_cost=80)
-        buyer = RuleBasedAgent(config=buyer_config)
-        seller = RuleBasedAgent(config=seller_config)
+class TestMarketSimulationMatching:
+
+    @pytest.fixture
+    def sim(self, empty_sim):
+        """A per-test copy of empty_sim set to round 1 (transactions take the current round)."""
+        sim = copy.copy(empty_sim)
+        sim.market_state = MarketState(current_round=1) # MarketState is frozen, so replace rather than copy it
+        return sim
+
+    @pytest.mark.parametrize("bids, asks, expected, remaining_bids, remaining_asks", [
+        pytest.param([(90, 1)], [(100, 1)], [], [1], [1], id="no_match_bid_lower_than_ask"),
+        pytest.param([(100, 1)], [(90, 1)], [("b0", "s0", 95.0, 1)], [0], [0], id="simple_match"),
+        # Limited by the seller's quantity; the buyer keeps the rest
+        pytest.param([(100, 5)], [(90, 2)], [("b0", "s0", 95.0, 2)], [3], [0], id="partial_fill_buyer_wants_more"),
+        # Limited by the buyer's quantity; the seller keeps the rest
+        pytest.param([(100, 2)], [(90, 5)], [("b0", "s0", 95.0, 2)], [0], [3], id="partial_fill_seller_wants_more"),
+        # Best bid b0 (105) takes s0 (90) for 1 and then s1 (95) for its last unit;
+        # b1 (100) clears the 3 s1 has left. Each trade is at the midpoint.
+        pytest.param([(105, 2), (100, 3)], [(90, 1), (95, 4)],
+                     [("b0", "s0", 97.5, 1), ("b0", "s1", 100.0, 1), ("b1", "s1", 97.5, 3)],
+                     [0, 0], [0, 0], id="multiple_matches"),
+    ])
+    def test_match_orders(self, sim, bids, asks, expected, remaining_bids, remaining_asks):
+        bid_orders = [_bid(f"b{i}", price, quantity) for i, (price, quantity) in enumerate(bids)]
+        ask_orders = [_ask(f"s{i}", price, quantity) for i, (price, quantity) in enumerate(asks)]
+        transactions = sim._match_orders_simple_CDA(bid_orders, ask_orders)
+
+        actual = np.array([(tx.buyer_id, tx.seller_id, tx.price, tx.quantity) for tx in transactions], dtype=_MATCH_DTYPE)
+        assert np.array_equal(actual, np.array(expected, dtype=_MATCH_DTYPE))
+        # _match_orders_simple_CDA fills the original bid/ask objects in place
+        assert [order.quantity for order in bid_orders] == remaining_bids
+        assert [order.quantity for order in ask_orders] == remaining_asks
+
+    def test_update_agent_states_after_transaction(self, make_agent):
+        # make_agent hands out copies of cached prototypes; agents hold only scalar state,
+        # so the shallow copy is as isolated as a deepcopy.
+        buyer = make_agent(agent_id="buyer_update", agent_type="buyer", initial_funds=1000, valuation_or_cost=100)
+        seller = make_agent(agent_id="seller_update", agent_type="seller", initial_inventory=10, valuation_or_cost=80)
         
         sim = MarketSimulation(agents=[buyer, seller], num_rounds=1)
-        sim.market_state.current_round = 1
+        sim.market_state = MarketState(current_round=1)
 
         # Manually create a transaction
-        tx = BidAsk(agent_id=buyer.agent_id, bid_ask_type="bid", price=90, quantity=2, round=1) # Buyer's bid
+        tx = _bid(buyer.agent_id, 90, 2) # Buyer's bid
         # Assume this bid was matched with an ask at price 90 for quantity 2
         transaction = sim._match_orders_simple_CDA(
             [tx], 
-            [BidAsk(agent_id=seller.agent_id, bid_ask_type="ask", price=90, quantity=5, round=1)]
+            [_ask(seller.agent_id, 90, 5)]
         )
         assert len(transaction) == 1
         
@@ -141,5 +82,91 @@ class TestMarketSimulationMatching:
         assert seller.funds == (transaction[0].price * 2) # 180
         assert seller.inventory == 10 - 2 # 8
 
+_BID_RESPONSE = '{"action": "BID", "price": 50.0, "quantity": 1}'
+_ASK_RESPONSE = '{"action": "ASK", "price": 200.0, "quantity": 1}'
+
+def _llm_agent(agent_id, agent_type, llm_client, prompt_manager):
+    config = AgentConfig(
+        agent_id=agent_id, agent_type=agent_type,
+        initial_funds=1000.0 if agent_type == "buyer" else None,
+        initial_inventory=10 if agent_type == "seller" else None,
+        llm_persona_prompt_key="default", valuation_or_cost=100.0,
+    )
+    return LLMAgent(config=config, llm_client=llm_client, prompt_manager=prompt_manager)
+
+class TestMarketSimulationRound:
+
+    def test_run_round_collects_pooled_and_llm_actions(self, make_agent, make_llm_client, stub_prompt_manager):
+        rule_buyer = make_agent(agent_id="rule_buyer", agent_type="buyer", initial_funds=1000, valuation_or_cost=100)
+        rule_seller = make_agent(agent_id="rule_seller", agent_type="seller", initial_inventory=10, valuation_or_cost=90)
+        buyer_client, buyer_stub = make_llm_client("async", _BID_RESPONSE)
+        seller_client, seller_stub = make_llm_client("async", _ASK_RESPONSE)
+        llm_buyer = _llm_agent("llm_buyer", "buyer", buyer_client, stub_prompt_manager)
+        llm_seller = _llm_agent("llm_seller", "seller", seller_client, stub_prompt_manager)
+        sim = MarketSimulation(agents=[rule_buyer, llm_buyer, rule_seller, llm_seller], num_rounds=1)
+
+        # Record what the pool decides, to check the rule-based agents went through it
+        pool = sim.rule_based_pool
+        pooled_actions = []
+        decide_all = pool.decide_all
+
+        def _recording_decide_all(market_state):
+            pooled_actions.extend(decide_all(market_state))
+            return pooled_actions
+        pool.decide_all = _recording_decide_all
+
+        sim.run_round()
+
+        assert [agent.agent_id for agent in pool.agents] == ["rule_buyer", "rule_seller"]
+        assert sorted(action.agent_id for action in pooled_actions) == ["rule_buyer", "rule_seller"]
+        assert sorted(bid.agent_id for bid in sim.market_state.bids) == ["llm_buyer", "rule_buyer"]
+        assert sorted(ask.agent_id for ask in sim.market_state.asks) == ["llm_seller", "rule_seller"]
+        assert (buyer_stub.async_calls, seller_stub.async_calls) == (1, 1)
+        assert sim.llm_operational_error is None
+
+    def test_run_round_one_batch_per_client(self, make_llm_client, stub_prompt_manager):
+        buyer_client, buyer_stub = make_llm_client("batch", _BID_RESPONSE)
+        seller_client, seller_stub = make_llm_client("batch", _ASK_RESPONSE)
+        agents = [_llm_agent(f"llm_buyer_{i}", "buyer", buyer_client, stub_prompt_manager) for i in range(3)]
+        agents += [_llm_agent(f"llm_seller_{i}", "seller", seller_client, stub_prompt_manager) for i in range(2)]
+        sim = MarketSimulation(agents=agents, num_rounds=1)
+
+        sim.run_round()
+
+        assert [len(batch) for batch in buyer_stub.batches] == [3]
+        assert [len(batch) for batch in seller_stub.batches] == [2]
+        assert buyer_stub.calls == seller_stub.calls == 0
+        assert len(sim.market_state.bids) == 3
+        assert len(sim.market_state.asks) == 2
+
+    @pytest.mark.parametrize("kind, batches, async_calls, calls", [
+        ("async", 0, 2, 0), # Preferred even though the client can also batch
+        ("batch", 1, 0, 0),
+        ("sync", 0, 0, 2),
+    ])
+    def test_run_round_dispatch_by_client_api(self, make_llm_client, stub_prompt_manager, kind, batches, async_calls, calls):
+        client, stub = make_llm_client(kind, _BID_RESPONSE)
+        agents = [_llm_agent(f"llm_buyer_{i}", "buyer", client, stub_prompt_manager) for i in range(2)]
+        sim = MarketSimulation(agents=agents, num_rounds=1)
+
+        sim.run_round()
+
+        assert (len(stub.batches), stub.async_calls, stub.calls) == (batches, async_calls, calls)
+        assert len(sim.market_state.bids) == 2
+
+    @pytest.mark.parametrize("kind", ["async", "batch", "sync"])
+    def test_run_simulation_reports_llm_errors(self, make_llm_client, make_agent, stub_prompt_manager, kind):
+        client, stub = make_llm_client(kind)
+        stub.side_effect = RuntimeError("LLM API unavailable")
+        rule_seller = make_agent(agent_id="rule_seller", agent_type="seller", initial_inventory=10, valuation_or_cost=90)
+        sim = MarketSimulation(agents=[_llm_agent("llm_buyer", "buyer", client, stub_prompt_manager), rule_seller],
+                               num_rounds=2)
+
+        history, error = sim.run_simulation()
+
+        assert len(history) == 2
+        assert error == "LLM Agent 'llm_buyer' failed to decide an action in round 1."
+        assert [ask.agent_id for ask in history[0].asks] == ["rule_seller"]
+
 # To run these tests:
 # pytest tests/core/test_simulation_engine.py
\ No newline at end of file
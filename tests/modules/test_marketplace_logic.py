@@ -1,5 +1,9 @@
 import pytest
-import pandas as pd
+import random
+import re
+import numpy as np
+from collections import Counter
+from types import MappingProxyType, SimpleNamespace
 from unittest.mock import patch, MagicMock
 
 from modules.marketplace.logic import (
@@ -7,63 +11,103 @@ from modules.marketplace.logic import (
     run_marketplace_simulation,
     process_simulation_results_for_display,
 )
-from core.models import AgentConfig, RuleBasedAgent, LLMAgent, MarketState, Transaction
-from core.simulation_engine import MarketSimulation # For mocking
+from core.models import RuleBasedAgent, LLMAgent, MarketState, Transaction
 
-# --- Fixtures ---
-
-@pytest.fixture
-def rule_based_buyer_config_template():
-    return {"initial_funds": 1000, "valuation_or_cost_range": (90, 110), "max_quantity_per_round": 5, "min_price_adjustment_factor": 0.95, "max_price_adjustment_factor": 1.05}
+# Error messages matched with pytest.raises, compiled once at import
+_LLM_DEPS_RE = re.compile(re.escape("LLMClient and PromptManager instances are required for LLMAgents."))
+_UNSUPPORTED_TYPE_RE = re.compile(re.escape("Unsupported agent type: unknown_type"))
+_SETUP_FAILED_RE = re.compile(re.escape("Setup failed due to invalid agent type"))
 
-@pytest.fixture
-def rule_based_seller_config_template():
-    return {"initial_inventory": 100, "valuation_or_cost_range": (80, 100), "min_quantity_per_round": 1, "max_quantity_per_round": 10, "min_price_adjustment_factor": 0.98, "max_price_adjustment_factor": 1.10}
+# --- Fixtures ---
 
-@pytest.fixture
-def llm_buyer_config_template():
-    return {"initial_funds": 1000, "llm_persona_prompt_key": "buyer_default", "max_quantity_per_round": 3}
+@pytest.fixture(autouse=True)
+def _seed():
+    """Reseeds before every test so randomized valuations don't depend on test order."""
+    random.seed(12345) # setup_simulation_agents draws valuations with random.uniform
+
+# The fixtures below are built once per session. Config templates are read-only views
+# (setup_simulation_agents only .copy()s them), and the LLM client/prompt manager
+# stand-ins hold no call state.
+
+@pytest.fixture(scope="session")
+def rule_based_templates():
+    """(buyer, seller) config templates for rule-based agents."""
+    return (
+        MappingProxyType({"initial_funds": 1000, "valuation_or_cost_range": (90, 110), "max_quantity_per_round": 5, "min_price_adjustment_factor": 0.95, "max_price_adjustment_factor": 1.05}),
+        MappingProxyType({"initial_inventory": 100, "valuation_or_cost_range": (80, 100), "min_quantity_per_round": 1, "max_quantity_per_round": 10, "min_price_adjustment_factor": 0.98, "max_price_adjustment_factor": 1.10}),
+    )
 
-@pytest.fixture
-def llm_seller_config_template():
-    return {"initial_inventory": 50, "llm_persona_prompt_key": "seller_default", "min_quantity_per_round": 1, "max_quantity_per_round": 8}
+@pytest.fixture(scope="session")
+def llm_templates():
+    """(buyer, seller) config templates for LLM agents."""
+    return (
+        MappingProxyType({"initial_funds": 1000, "llm_persona_prompt_key": "buyer_default", "max_quantity_per_round": 3}),
+        MappingProxyType({"initial_inventory": 50, "llm_persona_prompt_key": "seller_default", "min_quantity_per_round": 1, "max_quantity_per_round": 8}),
+    )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_llm_client():
-    return MagicMock()
+    # Only passed through and compared by identity; agents don't call it during setup
+    return object()
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_prompt_manager():
-    mock = MagicMock()
-    mock.get_prompt.return_value = "This is a test prompt for {role}."
-    return mock
+    # LLMAgent only fetches its assembled template through render_static
+    return SimpleNamespace(render_static=lambda prompt_key: f"This is the {prompt_key} test prompt.")
+
+@pytest.fixture(scope="session")
+def spec_mock_factory():
+    """
+    Returns make(spec_cls) -> MagicMock(spec_set=...). Each class's attribute names are
+    computed with dir() once per session and cached, and later mocks reuse that list instead
+    of introspecting the class again. spec_set also rejects assignments the class couldn't take.
+    """
+    spec_names = {}
+
+    def _make(spec_cls):
+        if spec_cls not in spec_names:
+            spec_names[spec_cls] = dir(spec_cls)
+        return MagicMock(spec_set=spec_names[spec_cls])
+
+    return _make
 
 # --- Tests for setup_simulation_agents ---
 
-def test_setup_rule_based_agents(rule_based_buyer_config_template, rule_based_seller_config_template):
-    num_buyers = 2
-    num_sellers = 3
+def _assert_group_fields(group, template, field_names):
+    """
+    Checks a whole group of same-type agents at once: every config copied field_names from
+    template, and all valuations lie within the template's range.
+    """
+    configs = [agent.config for agent in group]
+    for name in field_names:
+        assert {getattr(config, name) for config in configs} == {template[name]}
+    if "valuation_or_cost_range" in template:
+        low, high = template["valuation_or_cost_range"]
+        valuations = np.asarray([config.valuation_or_cost for config in configs])
+        assert ((valuations >= low) & (valuations <= high)).all()
+
+@pytest.mark.parametrize("num_buyers, num_sellers", [(1, 1), (2, 3)])
+def test_setup_rule_based_agents(num_buyers, num_sellers, rule_based_templates):
+    rule_based_buyer_config_template, rule_based_seller_config_template = rule_based_templates
     agents = setup_simulation_agents(
         num_buyers, rule_based_buyer_config_template,
         num_sellers, rule_based_seller_config_template,
         agent_type="rule_based"
     )
     assert len(agents) == num_buyers + num_sellers
-    assert sum(1 for agent in agents if agent.config.agent_type == "buyer") == num_buyers
-    assert sum(1 for agent in agents if agent.config.agent_type == "seller") == num_sellers
+    counts = Counter(agent.config.agent_type for agent in agents)
+    assert counts["buyer"] == num_buyers
+    assert counts["seller"] == num_sellers
     assert all(isinstance(agent, RuleBasedAgent) for agent in agents)
 
-    for agent in agents:
-        if agent.config.agent_type == "buyer":
-            assert agent.config.initial_funds == rule_based_buyer_config_template["initial_funds"]
-            assert 90 <= agent.config.valuation_or_cost <= 110
-            assert agent.config.max_quantity_per_round == rule_based_buyer_config_template["max_quantity_per_round"]
-        elif agent.config.agent_type == "seller":
-            assert agent.config.initial_inventory == rule_based_seller_config_template["initial_inventory"]
-            assert 80 <= agent.config.valuation_or_cost <= 100
-            assert agent.config.min_quantity_per_round == rule_based_seller_config_template["min_quantity_per_round"]
-
-def test_setup_llm_agents(llm_buyer_config_template, llm_seller_config_template, mock_llm_client, mock_prompt_manager):
+    buyers = [agent for agent in agents if agent.config.agent_type == "buyer"]
+    sellers = [agent for agent in agents if agent.config.agent_type == "seller"]
+    # The quantity/price-factor template keys aren't AgentConfig fields; from_dict drops them
+    _assert_group_fields(buyers, rule_based_buyer_config_template, ("initial_funds",))
+    _assert_group_fields(sellers, rule_based_seller_config_template, ("initial_inventory",))
+
+def test_setup_llm_agents(llm_templates, mock_llm_client, mock_prompt_manager):
+    llm_buyer_config_template, llm_seller_config_template = llm_templates
     num_buyers = 1
     num_sellers = 1
     agents = setup_simulation_agents(
@@ -74,40 +118,35 @@ def test_setup_llm_agents(llm_buyer_config_template, llm_seller_config_template,
         prompt_manager_instance=mock_prompt_manager
     )
     assert len(agents) == num_buyers + num_sellers
-    assert sum(1 for agent in agents if agent.config.agent_type == "buyer") == num_buyers
-    assert sum(1 for agent in agents if agent.config.agent_type == "seller") == num_sellers
+    counts = Counter(agent.config.agent_type for agent in agents)
+    assert counts["buyer"] == num_buyers
+    assert counts["seller"] == num_sellers
     assert all(isinstance(agent, LLMAgent) for agent in agents)
 
-    for agent in agents:
-        assert agent.llm_client == mock_llm_client
-        assert agent.prompt_manager == mock_prompt_manager
-        if agent.config.agent_type == "buyer":
-            assert agent.config.initial_funds == llm_buyer_config_template["initial_funds"]
-            assert agent.config.llm_persona_prompt_key == llm_buyer_config_template["llm_persona_prompt_key"]
-        elif agent.config.agent_type == "seller":
-            assert agent.config.initial_inventory == llm_seller_config_template["initial_inventory"]
-            assert agent.config.llm_persona_prompt_key == llm_seller_config_template["llm_persona_prompt_key"]
-
-def test_setup_llm_agents_missing_dependencies(llm_buyer_config_template, llm_seller_config_template):
-    with pytest.raises(ValueError, match="LLMClient and PromptManager instances are required for LLMAgents."):
-        setup_simulation_agents(
-            1, llm_buyer_config_template,
-            1, llm_seller_config_template,
-            agent_type="llm",
-            llm_client_instance=None, # Missing
-            prompt_manager_instance=MagicMock()
-        )
-    with pytest.raises(ValueError, match="LLMClient and PromptManager instances are required for LLMAgents."):
+    assert all(agent.llm_client == mock_llm_client and agent.prompt_manager == mock_prompt_manager for agent in agents)
+    buyers = [agent for agent in agents if agent.config.agent_type == "buyer"]
+    sellers = [agent for agent in agents if agent.config.agent_type == "seller"]
+    _assert_group_fields(buyers, llm_buyer_config_template, ("initial_funds", "llm_persona_prompt_key"))
+    _assert_group_fields(sellers, llm_seller_config_template, ("initial_inventory", "llm_persona_prompt_key"))
+
+@pytest.mark.parametrize("llm_client_instance, prompt_manager_instance", [
+    (None, MagicMock()), # Missing client
+    (MagicMock(), None), # Missing prompt manager
+], ids=["no_llm_client", "no_prompt_manager"])
+def test_setup_llm_agents_missing_dependencies(llm_client_instance, prompt_manager_instance, llm_templates):
+    llm_buyer_config_template, llm_seller_config_template = llm_templates
+    with pytest.raises(ValueError, match=_LLM_DEPS_RE):
         setup_simulation_agents(
             1, llm_buyer_config_template,
             1, llm_seller_config_template,
             agent_type="llm",
-            llm_client_instance=MagicMock(),
-            prompt_manager_instance=None # Missing
+            llm_client_instance=llm_client_instance,
+            prompt_manager_instance=prompt_manager_instance
         )
 
-def test_setup_agents_unsupported_type(rule_based_buyer_config_template, rule_based_seller_config_template):
-    with pytest.raises(ValueError, match="Unsupported agent type: unknown_type"):
+def test_setup_agents_unsupported_type(rule_based_templates):
+    rule_based_buyer_config_template, rule_based_seller_config_template = rule_based_templates
+    with pytest.raises(ValueError, match=_UNSUPPORTED_TYPE_RE):
         setup_simulation_agents(
             1, rule_based_buyer_config_template,
             1, rule_based_seller_config_template,
@@ -116,191 +155,203 @@ def test_setup_agents_unsupported_type(rule_based_buyer_config_template, rule_ba
 
 # --- Tests for run_marketplace_simulation ---
 
-@patch('modules.marketplace.logic.MarketSimulation')
-@patch('modules.marketplace.logic.setup_simulation_agents')
-def test_run_marketplace_simulation_basic(mock_setup_agents, mock_market_simulation_cls, rule_based_buyer_config_template, rule_based_seller_config_template):
-    mock_agents = [MagicMock(spec=RuleBasedAgent), MagicMock(spec=RuleBasedAgent)]
-    mock_setup_agents.return_value = mock_agents
+@pytest.fixture(scope="session")
+def market_simulation_cls():
+    """The real MarketSimulation, imported on first use; only needed as a spec for mocks."""
+    from core.simulation_engine import MarketSimulation
+    return MarketSimulation
+
+@pytest.fixture(scope="module")
+def sim_patches():
+    """
+    Patches logic's MarketSimulation and setup_simulation_agents once per module per worker.
+    The tests using it share the "sim" xdist_group, which only keeps them on the same worker;
+    every worker that imports this module still builds its own copy of this fixture.
+    """
+    with patch('modules.marketplace.logic.MarketSimulation') as sim_cls, \
+         patch('modules.marketplace.logic.setup_simulation_agents') as setup:
+        yield sim_cls, setup
+
+@pytest.fixture(scope="module")
+def mock_rule_agents(spec_mock_factory):
+    return (spec_mock_factory(RuleBasedAgent), spec_mock_factory(RuleBasedAgent))
+
+@pytest.fixture(scope="module")
+def mock_llm_agents(spec_mock_factory):
+    return (spec_mock_factory(LLMAgent),)
 
-    mock_sim_instance = MagicMock(spec=MarketSimulation)
-    sample_history = [
-        MarketState(current_round=0, total_rounds=1, transaction_log=[], price_history=[], agent_data={}),
-        MarketState(current_round=1, total_rounds=1, transaction_log=[], price_history=[], agent_data={})
-    ]
-    mock_sim_instance.run_simulation.return_value = (sample_history, None) # history, error
-    mock_market_simulation_cls.return_value = mock_sim_instance
-
-    num_buyers = 1
-    num_sellers = 1
-    num_rounds = 1
-
-    history, error = run_marketplace_simulation(
-        num_buyers, rule_based_buyer_config_template,
-        num_sellers, rule_based_seller_config_template,
-        num_rounds,
-        agent_creation_type="rule_based"
-    )
+@pytest.fixture
+def patched_sim(sim_patches):
+    """The module-wide (MarketSimulation, setup_simulation_agents) mocks, fully reset for this test."""
+    for mock in sim_patches:
+        mock.reset_mock(return_value=True, side_effect=True)
+    return sim_patches
 
-    mock_setup_agents.assert_called_once_with(
-        num_buyers, rule_based_buyer_config_template,
-        num_sellers, rule_based_seller_config_template,
-        agent_type="rule_based",
-        llm_client_instance=None,
-        prompt_manager_instance=None
+@pytest.fixture
+def sim_scenario(request, patched_sim, market_simulation_cls, spec_mock_factory, mock_rule_agents, mock_llm_agents,
+                 rule_based_templates, llm_templates, mock_llm_client, mock_prompt_manager):
+    """
+    Indirectly parametrized with a scenario name. It points the shared patches at that
+    scenario's behaviour and returns the run_marketplace_simulation kwargs together with
+    what the run should produce (expected history/error, or the exception it should raise).
+    """
+    mock_market_simulation_cls, mock_setup_agents = patched_sim
+    rule_based_buyer_config_template, rule_based_seller_config_template = rule_based_templates
+    llm_buyer_config_template, _ = llm_templates
+    scenario = SimpleNamespace(
+        sim_cls=mock_market_simulation_cls, setup=mock_setup_agents, agents=None, sim_instance=None,
+        expected_history=None, expected_error=None, raises=None,
     )
-    mock_market_simulation_cls.assert_called_once_with(agents=mock_agents, num_rounds=num_rounds)
-    mock_sim_instance.run_simulation.assert_called_once()
-    assert history == sample_history
-    assert error is None
-
-@patch('modules.marketplace.logic.MarketSimulation')
-@patch('modules.marketplace.logic.setup_simulation_agents')
-def test_run_marketplace_simulation_setup_failure(mock_setup_agents, mock_market_simulation_cls, rule_based_buyer_config_template, rule_based_seller_config_template):
-    # Simulate setup_simulation_agents raising an error (e.g., invalid agent type)
-    mock_setup_agents.side_effect = ValueError("Setup failed due to invalid agent type")
 
-    num_buyers = 1
-    num_sellers = 1
-    num_rounds = 1
-
-    # Check that the ValueError from setup_simulation_agents propagates
-    with pytest.raises(ValueError, match="Setup failed due to invalid agent type"):
-        run_marketplace_simulation(
-            num_buyers, rule_based_buyer_config_template,
-            num_sellers, rule_based_seller_config_template,
-            num_rounds,
-            agent_creation_type="invalid_type" # This would cause setup_simulation_agents to fail
+    if request.param == "setup_fail":
+        # Simulate setup_simulation_agents raising an error (e.g., invalid agent type)
+        mock_setup_agents.side_effect = ValueError("Setup failed due to invalid agent type")
+        scenario.raises = _SETUP_FAILED_RE
+        scenario.kwargs = dict(
+            num_buyers=1, buyer_config_params=rule_based_buyer_config_template,
+            num_sellers=1, seller_config_params=rule_based_seller_config_template,
+            num_rounds=1, agent_creation_type="invalid_type", # This would cause setup_simulation_agents to fail
+        )
+        return scenario
+
+    if request.param == "basic":
+        scenario.agents = mock_rule_agents
+        scenario.expected_history = [MarketState(current_round=0), MarketState(current_round=1)]
+        scenario.kwargs = dict(
+            num_buyers=1, buyer_config_params=rule_based_buyer_config_template,
+            num_sellers=1, seller_config_params=rule_based_seller_config_template,
+            num_rounds=1, agent_creation_type="rule_based",
+        )
+    else: # "llm_error": the engine reports an LLM failure alongside an empty history
+        scenario.agents = mock_llm_agents
+        scenario.expected_history = []
+        scenario.expected_error = "LLM API unavailable"
+        scenario.kwargs = dict(
+            num_buyers=1, buyer_config_params=llm_buyer_config_template,
+            num_sellers=0, seller_config_params={}, # No sellers for simplicity
+            num_rounds=1, agent_creation_type="llm",
+            llm_client=mock_llm_client, prompt_manager=mock_prompt_manager,
         )
-    mock_market_simulation_cls.assert_not_called() # Simulation should not be created if setup fails
-
-@patch('modules.marketplace.logic.MarketSimulation')
-@patch('modules.marketplace.logic.setup_simulation_agents')
-def test_run_marketplace_simulation_llm_error(mock_setup_agents, mock_market_simulation_cls, llm_buyer_config_template, llm_seller_config_template, mock_llm_client, mock_prompt_manager):
-    mock_agents = [MagicMock(spec=LLMAgent)]
-    mock_setup_agents.return_value = mock_agents
-
-    mock_sim_instance = MagicMock(spec=MarketSimulation)
-    llm_error_message = "LLM API unavailable"
-    mock_sim_instance.run_simulation.return_value = ([], llm_error_message) # Empty history, error
-    mock_market_simulation_cls.return_value = mock_sim_instance
-
-    history, error = run_marketplace_simulation(
-        1, llm_buyer_config_template,
-        0, {}, # No sellers for simplicity
-        1,
-        agent_creation_type="llm",
-        llm_client=mock_llm_client,
-        prompt_manager=mock_prompt_manager
-    )
 
-    assert history == []
-    assert error == llm_error_message
-    mock_setup_agents.assert_called_once()
-    mock_market_simulation_cls.assert_called_once()
-    mock_sim_instance.run_simulation.assert_called_once()
+    for mock in scenario.agents:
+        mock.reset_mock()
+    mock_setup_agents.return_value = scenario.agents
+    scenario.sim_instance = spec_mock_factory(market_simulation_cls)
+    scenario.sim_instance.run_simulation.return_value = (scenario.expected_history, scenario.expected_error)
+    mock_market_simulation_cls.return_value = scenario.sim_instance
+    return scenario
+
+@pytest.mark.xdist_group(name="sim")
+@pytest.mark.parametrize("sim_scenario", ["basic", "llm_error", "setup_fail"], indirect=True)
+def test_run_marketplace_simulation(sim_scenario):
+    kwargs = sim_scenario.kwargs
+
+    if sim_scenario.raises is not None:
+        # The ValueError from setup_simulation_agents propagates
+        with pytest.raises(ValueError, match=sim_scenario.raises):
+            run_marketplace_simulation(**kwargs)
+        sim_scenario.sim_cls.assert_not_called() # Simulation should not be created if setup fails
+        return
+
+    history, error = run_marketplace_simulation(**kwargs)
+
+    sim_scenario.setup.assert_called_once_with(
+        kwargs["num_buyers"], kwargs["buyer_config_params"],
+        kwargs["num_sellers"], kwargs["seller_config_params"],
+        agent_type=kwargs["agent_creation_type"],
+        llm_client_instance=kwargs.get("llm_client"),
+        prompt_manager_instance=kwargs.get("prompt_manager")
+    )
+    sim_scenario.sim_cls.assert_called_once_with(agents=sim_scenario.agents, num_rounds=kwargs["num_rounds"])
+    sim_scenario.sim_instance.run_simulation.assert_called_once()
+    assert history == sim_scenario.expected_history
+    assert error == sim_scenario.expected_error
 
 
 # --- Tests for process_simulation_results_for_display ---
 
-def test_process_simulation_results_empty_history():
-    results = process_simulation_results_for_display([])
-    assert results["rounds"] == []
-    assert results["average_prices"] == []
-    assert results["volumes"] == []
-    assert results["num_transactions_per_round"] == []
-    assert results["all_transactions"] == []
-
-def test_process_simulation_results_basic():
-    history = [
-        MarketState(
-            current_round=0, total_rounds=2,
-            transaction_log=[
-                Transaction(round=0, buyer_id="b1", seller_id="s1", price=10, quantity=2, timestamp=0),
-                Transaction(round=0, buyer_id="b2", seller_id="s2", price=12, quantity=1, timestamp=1)
-            ],
-            price_history=[{"round": 0, "average_price": 10.67, "volume": 3, "num_transactions": 2}],
-            agent_data={}
-        ),
-        MarketState(
-            current_round=1, total_rounds=2,
-            transaction_log=[
-                Transaction(round=1, buyer_id="b1", seller_id="s2", price=11, quantity=3, timestamp=2)
-            ],
-            price_history=[
-                {"round": 0, "average_price": 10.67, "volume": 3, "num_transactions": 2}, # from previous round
-                {"round": 1, "average_price": 11.00, "volume": 3, "num_transactions": 1}
-            ],
-            agent_data={}
-        )
-    ]
-    results = process_simulation_results_for_display(history)
-
-    assert results["rounds"] == [0, 1]
-    assert results["average_prices"] == [10.67, 11.00]
-    assert results["volumes"] == [3, 3]
-    assert results["num_transactions_per_round"] == [2, 1]
-    assert len(results["all_transactions"]) == 3
-    assert results["all_transactions"][0] == {"round": 0, "buyer_id": "b1", "seller_id": "s1", "price": 10, "quantity": 2}
-    assert results["all_transactions"][1] == {"round": 0, "buyer_id": "b2", "seller_id": "s2", "price": 12, "quantity": 1}
-    assert results["all_transactions"][2] == {"round": 1, "buyer_id": "b1", "seller_id": "s2", "price": 11, "quantity": 3}
-
-def test_process_simulation_results_no_transactions_in_a_round():
-    history = [
-        MarketState(
-            current_round=0, total_rounds=2,
-            transaction_log=[Transaction(round=0, buyer_id="b1", seller_id="s1", price=10, quantity=2, timestamp=0)],
-            price_history=[{"round": 0, "average_price": 10.00, "volume": 2, "num_transactions": 1}],
-            agent_data={}
-        ),
-        MarketState( # Round 1 has no transactions
-            current_round=1, total_rounds=2,
-            transaction_log=[], # No transactions for round 1 in this state's log
-            price_history=[{"round": 0, "average_price": 10.00, "volume": 2, "num_transactions": 1}], # Only round 0 price history
-            agent_data={}
-        ),
-         MarketState(
-            current_round=2, total_rounds=2,
-            transaction_log=[Transaction(round=2, buyer_id="b2", seller_id="s2", price=15, quantity=1, timestamp=0)],
-            price_history=[
-                {"round": 0, "average_price": 10.00, "volume": 2, "num_transactions": 1},
-                {"round": 2, "average_price": 15.00, "volume": 1, "num_transactions": 1} # No entry for round 1
-            ],
-            agent_data={}
-        )
-    ]
-    results = process_simulation_results_for_display(history)
-
-    assert results["rounds"] == [0, 1, 2]
-    # Price from round 0 is carried to round 1, then round 2 has its own price
-    assert results["average_prices"] == [10.00, 10.00, 15.00]
-    assert results["volumes"] == [2, 0, 1] # Volume is 0 for round 1
-    assert results["num_transactions_per_round"] == [1, 0, 1] # Num transactions is 0 for round 1
-    assert len(results["all_transactions"]) == 2
-    assert results["all_transactions"][0]["round"] == 0
-    assert results["all_transactions"][1]["round"] == 2
-
-
-def test_process_simulation_results_padding_logic():
-    # Test case where a round might be missing price_history entry entirely,
-    # or where lists might end up with different lengths before padding.
-    # The function logic tries to find price_info_for_round for the current_round.
-    # If not found, it pads.
-    history = [
-        MarketState(current_round=0, total_rounds=3, transaction_log=[],
-                    price_history=[{"round": 0, "average_price": 10, "volume": 1, "num_transactions": 1}], agent_data={}),
-        MarketState(current_round=1, total_rounds=3, transaction_log=[],
-                    price_history=[{"round": 0, "average_price": 10, "volume": 1, "num_transactions": 1}], agent_data={}), # No price_history for round 1
-        MarketState(current_round=2, total_rounds=3, transaction_log=[],
-                    price_history=[
-                        {"round": 0, "average_price": 10, "volume": 1, "num_transactions": 1},
-                        {"round": 2, "average_price": 12, "volume": 1, "num_transactions": 1}
-                    ], agent_data={}),
-    ]
-    results = process_simulation_results_for_display(history)
-    assert results["rounds"] == [0, 1, 2]
-    assert results["average_prices"] == [10, 10, 12] # 10 carried from round 0 to 1
-    assert results["volumes"] == [1, 0, 1]
-    assert results["num_transactions_per_round"] == [1, 0, 1]
+# Compact history specs: each entry is
+# (current_round, [(round, buyer_id, seller_id, price, quantity), ...], [price_history dicts]).
+# Keep them minimal. process_simulation_results_for_display only reads, per state, the
+# transactions from current_round and the price_history entry for current_round. Entries
+# carried over from earlier rounds are never looked at, so leave them out (the padding case
+# keeps exactly one to check that). A round without trades simply has no entry of its own.
+HISTORY_SPECS = {
+    "empty": [],
+    "basic": [
+        (0, [(0, "b1", "s1", 10, 2), (0, "b2", "s2", 12, 1)],
+         [{"round": 0, "average_price": 10.67, "volume": 3, "num_transactions": 2}]),
+        (1, [(1, "b1", "s2", 11, 3)],
+         [{"round": 1, "average_price": 11.00, "volume": 3, "num_transactions": 1}]),
+    ],
+    "empty_round": [
+        (0, [(0, "b1", "s1", 10, 2)],
+         [{"round": 0, "average_price": 10.00, "volume": 2, "num_transactions": 1}]),
+        (1, [], []),
+        (2, [(2, "b2", "s2", 15, 1)],
+         [{"round": 2, "average_price": 15.00, "volume": 1, "num_transactions": 1}]),
+    ],
+    # Same gap with empty transaction logs; round 1 only has round 0's stale entry, which
+    # must not be mistaken for its own
+    "padding": [
+        (0, [], [{"round": 0, "average_price": 10, "volume": 1, "num_transactions": 1}]),
+        (1, [], [{"round": 0, "average_price": 10, "volume": 1, "num_transactions": 1}]),
+        (2, [], [{"round": 2, "average_price": 12, "volume": 1, "num_transactions": 1}]),
+    ],
+    # Performance sentinel: one round with many transactions to flatten
+    "many_transactions": [
+        (0, [(0, f"b{i}", f"s{i}", 10 + i, 1) for i in range(1000)],
+         [{"round": 0, "average_price": 509.5, "volume": 1000, "num_transactions": 1000}]),
+    ],
+}
+
+@pytest.fixture(scope="session")
+def sample_histories():
+    """
+    MarketState histories for every HISTORY_SPECS entry, built once per session.
+    The specs are known-valid, so Transactions skip Pydantic validation via model_construct
+    (MarketState is a plain dataclass with nothing to validate). MarketState is frozen and
+    process_simulation_results_for_display only reads, so tests share them as-is.
+    """
+    return {
+        key: [
+            MarketState(
+                current_round=current_round,
+                transaction_log=tuple(
+                    Transaction.model_construct(round=tx_round, buyer_id=buyer_id, seller_id=seller_id, price=price, quantity=quantity)
+                    for tx_round, buyer_id, seller_id, price, quantity in transactions
+                ),
+                price_history=tuple(price_history),
+            )
+            for current_round, transactions, price_history in spec
+        ]
+        for key, spec in HISTORY_SPECS.items()
+    }
+
+def _tx_dict(tx_round, buyer_id, seller_id, price, quantity):
+    return {"round": tx_round, "buyer_id": buyer_id, "seller_id": seller_id, "price": price, "quantity": quantity}
+
+@pytest.mark.parametrize("history_key, expected_rounds, expected_prices, expected_volumes, expected_tx_counts, expected_transactions", [
+    ("empty", [], [], [], [], []),
+    ("basic", [0, 1], [10.67, 11.00], [3, 3], [2, 1],
+     [_tx_dict(0, "b1", "s1", 10, 2), _tx_dict(0, "b2", "s2", 12, 1), _tx_dict(1, "b1", "s2", 11, 3)]),
+    # Round 0's price is carried into the empty round, while volume and transaction count drop to 0
+    ("empty_round", [0, 1, 2], [10.00, 10.00, 15.00], [2, 0, 1], [1, 0, 1],
+     [_tx_dict(0, "b1", "s1", 10, 2), _tx_dict(2, "b2", "s2", 15, 1)]),
+    ("padding", [0, 1, 2], [10, 10, 12], [1, 0, 1], [1, 0, 1], []),
+    pytest.param("many_transactions", [0], [509.5], [1000], [1000],
+                 [_tx_dict(0, f"b{i}", f"s{i}", 10 + i, 1) for i in range(1000)],
+                 marks=pytest.mark.benchmark),
+], ids=["empty", "basic", "empty_round", "padding", "many_transactions"])
+def test_process_simulation_results(sample_histories, history_key, expected_rounds, expected_prices,
+                                    expected_volumes, expected_tx_counts, expected_transactions):
+    results = process_simulation_results_for_display(sample_histories[history_key])
+
+    assert results["rounds"] == expected_rounds
+    assert results["average_prices"] == expected_prices
+    assert results["volumes"] == expected_volumes
+    assert results["num_transactions_per_round"] == expected_tx_counts
+    assert results["all_transactions"] == expected_transactions
 
 # Note: The original request mentioned testing calculation of `price_over_rounds_df`
 # and `volume_over_rounds_df` and `transaction_stats`.